@@ -4,33 +4,26 @@ simulator.py: a masochistic GUI. Used mainly for tests/controller learning
 """
 
 from __future__ import division
-from collections import defaultdict
-from math import sqrt
+from multiprocessing import Pool
+from timeit import default_timer as timer
 from traceback import format_exc
+from itertools import islice
+import random
 
 from foxgame.structures import Direction
+from foxgame.gamecore import FoxGameError, tick_games
 from foxgame.options import FoxgameOption
 from foxgame.controller import Brain
+from foxgame.stats import RunningStats, normal_ppf
+from foxgame import results
+from foxgame import instrument
+from foxgame.factories import (GameFactory, ControllerFactory,
+                               load_brain)
 
 from logging import getLogger
 log = getLogger(__name__)
 
 
-def average(samples):
-    """
-    Computes the arithmetic mean of a list of numbers.
-    """
-    return sum(samples) / len(samples) if samples else 0
-
-
-def deviation(samples):
-    """
-    Computes the deviation of a list of numbers.
-    """
-    samplemid = average(samples)
-    return sqrt(sum((x-samplemid)**2
-                for x in samples) / len(samples))
-
 ##########
 ## JOBS ##
 ##########
@@ -42,6 +35,9 @@ class NullJob:
     @staticmethod
     def onjob(uinst): pass
 
+    @staticmethod
+    def merge(uinst, store): pass
+
     @staticmethod
     def postjob(uinst): pass
 
@@ -50,63 +46,97 @@ class BenchmarkJob:
     """
     Display some useful informations about benchmarking.
     """
+    # percentiles displayed by postjob
+    percentiles = (5, 25, 50, 75, 95)
+
     @staticmethod
     def onjob(uinst):
         """
         Store the following informations:
         - carrots eaten
         - time elapsed
+        - carrots per minute
+        - ticks played
+        - ticks per second of wall time
         """
         # shortcuts
         carrots = uinst.game.hare.carrots
         time = uinst.game.time_elapsed
+        cpm = 60*carrots/time
+        ticks = int(round(time / uinst.timestep))
+        tps = ticks / max(timer() - uinst.started, 1e-6)
 
         # store the informations
-        uinst.store['carrots'].append(carrots)
-        uinst.store['time'].append(time)
+        for key, value in (('carrots', carrots),
+                           ('time', time),
+                           ('cpm', cpm),
+                           ('ticks', ticks),
+                           ('tps', tps)):
+            uinst.store.setdefault(key, RunningStats()).add(value)
 
         # log informations about hte current game
         log.info('gameplay-statistics: '
                  'carrots: %d; '
                  'time elapsed: %d; '
-                 'cpm: %d' % (carrots, time, 60*carrots/time))
+                 'cpm: %d' % (carrots, time, cpm))
+
+    @staticmethod
+    def merge(uinst, store):
+        """
+        Add informations stored by a worker process.
+        """
+        for key, stats in store.iteritems():
+            uinst.store.setdefault(key, RunningStats()).merge(stats)
 
     @staticmethod
     def postjob(uinst):
         """
-        Print the average / deviation of previously
+        Print the average / deviation / percentiles of previously
         stored values.
         """
         if not uinst.store.values():
             # assume the game is ended before starting
             return
 
+        carrots = uinst.store['carrots']
+        time = uinst.store['time']
+        cpm = uinst.store['cpm']
+
         # AVERAGE
         print 'Average:'
 
         #  carrots
-        caverage =  average(uinst.store['carrots'])
+        caverage = carrots.mean
         print '\tcarrots: %d' % caverage
 
         #  time
-        taverage = average(uinst.store['time'])
+        taverage = time.mean
         print '\ttime: %d"' % taverage
 
         #  cpm
-        cpmaverage = 60*sum(uinst.store['carrots']) / sum(uinst.store['time'])
+        cpmaverage = 60*carrots.total / time.total
         print '\tcpm: %d' % cpmaverage
 
         # DEVIATION
         print 'Deviation:'
 
         #  carrots
-        cdeviat = deviation(uinst.store['carrots'])
+        cdeviat = carrots.deviation
         print '\tcarrots: %d' % cdeviat
 
         # time
-        tdeviat = deviation(uinst.store['time'])
+        tdeviat = time.deviation
         print '\ttime: %d"' % tdeviat
 
+        # PERCENTILES
+        percentiles = BenchmarkJob.percentiles
+        print 'Percentiles (%s):' % ' '.join('%d%%' % p for p in percentiles)
+        for key, stats, fmt in (('carrots', carrots, '%.0f'),
+                                ('time', time, '%.1f"'),
+                                ('cpm', cpm, '%.1f')):
+            print '\t%s: %s' % (key, ' '.join(fmt % stats.quantile(p / 100)
+                                               for p in percentiles))
+
         # LOG
         log.debug('benchmarking-statistics: average - '
                  '%d carrots; '
@@ -115,6 +145,11 @@ class BenchmarkJob:
         log.debug('benchmarking-statistics: deviation - '
                   '%d carrots; '
                   '%d secs' % (cdeviat, tdeviat))
+        log.debug('benchmarking-statistics: median - '
+                  '%.0f carrots; '
+                  '%.1f secs; '
+                  '%.1f cpm' % (carrots.quantile(.5), time.quantile(.5),
+                                cpm.quantile(.5)))
 
 
 class RawBrain(Brain):
@@ -141,6 +176,154 @@ class RawBrain(Brain):
         return Direction(map(int, strdir.split()))
 
 
+def play(game, timestep, looptime):
+    """
+    Play game until the hare is caught or looptime seconds elapse.
+    """
+    while game.tick(timestep) != False and game.time_elapsed <= looptime:
+        pass
+
+
+def play_batch(new_game, seeds, timestep, looptime, size=1, reuse=False):
+    """
+    Play a game for each seed given, 'size' games at once (see
+    gamecore.tick_games) until the hare is caught or looptime seconds
+    elapse. Yield each game as it ends, with the wall time spent playing
+    it; when the next game is requested, it is ended (or reset with the
+    next seed, if reuse is True).
+    """
+    seeds = iter(seeds)
+    playing = [new_game(seed) for seed in islice(seeds, size)]
+    going = []
+    spent = dict.fromkeys(playing, 0)
+
+    try:
+        while playing:
+            start = timer()
+            if len(playing) == 1:
+                results = [playing[0].tick(timestep)]
+            else:
+                results = tick_games(playing, timestep)
+            share = (timer() - start) / len(playing)
+
+            going = []
+            for game, result in zip(playing, results):
+                spent[game] += share
+                if result != False and game.time_elapsed <= looptime:
+                    going.append(game)
+                    continue
+
+                yield game, spent.pop(game)
+
+                seed = next(seeds, None)
+                if seed is None:
+                    game.end()
+                    continue
+                if reuse:
+                    game.reset(seed)
+                else:
+                    game.end()
+                    game = new_game(seed)
+                spent[game] = 0
+                going.append(game)
+            playing = going
+    finally:
+        # the caller may stop before all the games are played
+        for game in playing + going:
+            if not game.ended:
+                game.end()
+
+
+def score(game):
+    """
+    Return the carrots per minute eaten in a played game.
+    """
+    return 60*game.hare.carrots/game.time_elapsed
+
+
+def play_rival(rival_factory, seed, timestep, looptime):
+    """
+    Play with the rival hare brain the game with the given seed,
+    and return its score.
+    """
+    game = rival_factory.new_game(seed)
+    try:
+        play(game, timestep, looptime)
+        return score(game)
+    finally:
+        game.end()
+
+
+class Worker(object):
+    """
+    Plays games in a worker process, storing informations for the job
+    as GUI does.
+    """
+
+    def __init__(self, game_factory, job, timestep, looptime, reuse,
+                 rival_factory=None, batch=1):
+        self.gfact = game_factory
+        self.job = job
+        self.timestep = timestep
+        self.looptime = looptime
+        self.reuse = reuse
+        self.rivalfact = rival_factory
+        self.batch = batch
+
+        self.game = None
+        self.store = None
+        # wall time when the current game started
+        self.started = None
+
+    def run(self, seeds):
+        """
+        Play a game for each seed given, then return the informations stored
+        and the list of game scores (see GUI.measure).
+        """
+        self.store = {}
+        scores = []
+
+        for self.game, spent in play_batch(self.gfact.new_game, seeds,
+                                           self.timestep, self.looptime,
+                                           self.batch, self.reuse):
+            self.started = timer() - spent
+            self.job.onjob(self)
+
+            scores.append(score(self.game))
+            if self.rivalfact is not None:
+                scores[-1] -= play_rival(self.rivalfact, self.game.seed,
+                                         self.timestep, self.looptime)
+
+        self.game = None
+        return self.store, scores
+
+
+# the Worker of the current process
+worker = None
+
+
+def init_worker(*args):
+    """
+    Set up the Worker of a new process.
+    """
+    global worker
+
+    # brains using the global random generator must not share its
+    # state (inherited from the parent process) with other workers
+    random.seed()
+    # each worker reports its own latencies
+    instrument.dump_at_exit()
+
+    worker = Worker(*args)
+
+
+def run_worker(seeds):
+    """
+    Play games with the Worker of the current process.
+    """
+    return worker.run(seeds)
+
+
 class GUI(object):
     """
     A simple interface which doesn't show any output on the screen.
@@ -148,8 +331,30 @@ class GUI(object):
 
     job = BenchmarkJob
 
+    # maximum number of games
     games = 1
+    # number of processes playing games in parallel
+    workers = 1
     looptime = 300
+    # duration of a tick: collisions are swept, so it can be large
+    timestep = 1/32
+    # reset the same game instead of building a new one for each game
+    reuse = False
+    # number of games played at once: brains implementing update_batch
+    # decide for all of them together
+    batch = 1
+    # file where to save the results (JSON, or CSV if ending with .csv)
+    result = None
+
+    # early stopping: stop when the confidence interval of the carrots
+    # per minute is narrower than 'ci', or when the hare brain is found
+    # better or worse than the 'rival' hare brain playing the same games
+    ci = None
+    rival = None
+    confidence = 0.95
+    # games played before the first check, and between two checks
+    mingames = 30
+    lookevery = 10
 
     def __new__(cls, game_factory):
         # set up jobs properly
@@ -165,43 +370,247 @@ class GUI(object):
           size      => game arena size
           store     => a dictionary used by the 'job' function
                        in order to save some datas for the 'postjob'
+          scores    => statistics of the carrots per minute, or of their
+                       difference with the rival, used for early stopping
+          began     => wall time when the GUI was set up
+          started   => wall time when the current game started
         """
         #  factories
         self.gfact = game_factory
         self.gfact.harefact.brain = self.gfact.harefact.brain or RawBrain
+        self.rivalfact = None
+        if self.rival:
+            try:
+                rival_brain = load_brain(self.rival, 'HareBrain')
+            except (ImportError, AttributeError), e:
+                raise FoxGameError('simulator',
+                                   'unable to load rival %s: %s' % (
+                                   self.rival, e))
+            if rival_brain is None:
+                raise FoxGameError('simulator', 'rival must be a hare brain')
+            self.rivalfact = GameFactory(
+                self.gfact.size,
+                ControllerFactory(rival_brain,
+                                  self.gfact.harefact.postfilters),
+                self.gfact.foxfact, self.gfact.foxnum)
         #  game
         self.game = self.gfact.new_game()
         # store
-        self.store = defaultdict(list)
+        self.store = {}
+        self.scores = RunningStats()
+        self.stopped = None
+        # clocks
+        self.began = self.started = timer()
+
+    @property
+    def early_stopping(self):
+        return bool(self.ci or self.rival)
 
     def tick(self, time):
         return self.game.tick(time)
 
+    def measure(self):
+        """
+        Add the score of the game just played to self.scores; if there's
+        a rival, play the same game with it and add the difference.
+        """
+        value = score(self.game)
+        if self.rivalfact is not None:
+            value -= play_rival(self.rivalfact, self.game.seed,
+                                self.timestep, self.looptime)
+        self.scores.add(value)
+
+    def check(self):
+        """
+        Return why to stop playing games, or None to go on.
+        Checks are done every self.lookevery games.
+        """
+        played = self.scores.count
+        if played < self.mingames or played % self.lookevery:
+            return None
+
+        if self.rival:
+            # sequential test on paired scores: splitting alpha over
+            # all the checks keeps the overall error rate below alpha
+            looks = max(1, (type(self).games - self.mingames) //
+                            self.lookevery + 1)
+            alpha = (1 - self.confidence) / looks
+            if (self.scores.error and abs(self.scores.mean) >
+                normal_ppf(1 - alpha/2) * self.scores.error):
+                return 'better' if self.scores.mean > 0 else 'worse'
+
+        if self.ci and (2*self.scores.interval(self.confidence) <= self.ci):
+            return 'confident'
+
+        return None
+
     def recycle(self):
-        # end the current game
         self._job()
-        self.game.end()
-
-        # start a new game
         self.games -= 1
-        self.game = self.gfact.new_game()
+        if self.early_stopping:
+            self.measure()
+
+        if self.reuse:
+            # play again the same game
+            self.game.reset(self.gfact.next_seed())
+        else:
+            # end the current game, and start a new one
+            self.game.end()
+            self.game = self.gfact.new_game()
+        self.started = timer()
+
+    def report(self):
+        """
+        Print the result of early stopping.
+        """
+        if not self.scores.count:
+            return
+
+        interval = self.scores.interval(self.confidence)
+        if self.rival:
+            print 'Compared with %s (%d games):' % (self.rival,
+                                                    self.scores.count)
+            print '\tcpm difference: %+.2f +- %.2f (%d%%)' % (
+                   self.scores.mean, interval, self.confidence*100)
+            print '\tresult: %s' % (self.stopped or 'undecided')
+        else:
+            print 'Stopped after %d games:' % self.scores.count
+            print '\tcpm: %.2f +- %.2f (%d%%)' % (
+                   self.scores.mean, interval, self.confidence*100)
+
+        log.info('early-stopping: %s after %d games' % (
+                 self.stopped or 'undecided', self.scores.count))
 
     def quitall(self):
         if not self.game.ended:
             self.game.end()
         self._postjob()
+        if self.early_stopping:
+            self.report()
+        if self.result:
+            self.save_result()
+
+    def save_result(self):
+        """
+        Save informations about the game factory and the simulator,
+        and statistics stored by the job, to self.result.
+        """
+        info = dict(self.gfact.info)
+        info['simulator'] = {'games': type(self).games,
+                             'workers': self.workers,
+                             'batch': self.batch,
+                             'timestep': self.timestep,
+                             'looptime': self.looptime,
+                             'reuse': self.reuse,
+                             'ci': self.ci,
+                             'rival': self.rival,
+                             'stopped': self.stopped}
+
+        record = results.make_record(info, self.store,
+                                     timer() - self.began, self.confidence)
+        results.save(record, self.result)
+        log.info('results saved to %s' % self.result)
+
+    def run(self):
+        """
+        Play all the games in this process.
+        """
+        while self.games > 0:
+            # if the game is ended or seems to fall into an infinite loop
+            if (self.tick(self.timestep) == False or
+                self.game.time_elapsed > self.looptime):
+                log.info('game #%d ended' % (GUI.games-self.games+1))
+                # decrease the game counter
+                self.recycle()
+
+                if self.early_stopping:
+                    self.stopped = self.check()
+                    if self.stopped:
+                        break
+
+    def run_batch(self):
+        """
+        Play all the games in this process, self.batch games at once.
+        Games get the same seeds they would get in self.run(), but
+        they end in a different order.
+        """
+        # the current game was built just to draw its seed
+        seeds = [self.game.seed]
+        seeds.extend(self.gfact.next_seed() for x in xrange(self.games - 1))
+        self.game.end()
+
+        for self.game, spent in play_batch(self.gfact.new_game, seeds,
+                                           self.timestep, self.looptime,
+                                           self.batch, self.reuse):
+            log.info('game #%d ended' % (GUI.games-self.games+1))
+            self.started = timer() - spent
+            self._job()
+            self.games -= 1
+
+            if self.early_stopping:
+                self.measure()
+                self.stopped = self.check()
+                if self.stopped:
+                    break
+
+    def run_parallel(self):
+        """
+        Play all the games using a pool of self.workers processes.
+
+        Games get the same seeds they would get if played in this process,
+        and informations are merged in the same order, so the results are
+        the same of self.run().
+        """
+        # the current game was built just to draw its seed
+        seeds = [self.game.seed]
+        seeds.extend(self.gfact.next_seed() for x in xrange(self.games - 1))
+
+        if self.early_stopping:
+            # results must be checked as often as in self.run()
+            chunksize = self.lookevery
+        else:
+            chunksize = max(1, len(seeds) // (self.workers * 8))
+        chunks = [seeds[i:i+chunksize]
+                  for i in xrange(0, len(seeds), chunksize)]
+
+        pool = Pool(self.workers, init_worker,
+                    (self.gfact, self.job, self.timestep,
+                     self.looptime, self.reuse, self.rivalfact, self.batch))
+        try:
+            for store, scores in pool.imap(run_worker, chunks):
+                self.job.merge(self, store)
+                self.games -= len(scores)
+                log.info('%d games left' % self.games)
+
+                if self.early_stopping:
+                    for value in scores:
+                        self.scores.add(value)
+                    self.stopped = self.check()
+                    if self.stopped:
+                        break
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            if self.stopped:
+                # don't wait for the games left
+                pool.terminate()
+            pool.join()
 
 
 def main(gfact):
     # setting up the gui
     ui = GUI(gfact)
     try:
-        while ui.games > 0:
-            # if the game is ended or seems to fall into an infinite loop
-            if ui.tick(1/32) == False or ui.game.time_elapsed > ui.looptime:
-                log.info('game #%d ended' % (GUI.games-ui.games+1))
-                # decrease the game counter
-                ui.recycle()
+        if gfact.harefact.brain is RawBrain:
+            ui.run()
+        elif ui.workers > 1:
+            ui.run_parallel()
+        elif ui.batch > 1:
+            ui.run_batch()
+        else:
+            ui.run()
     except KeyboardInterrupt:
         log.info('game stopped by the user')
         print 'game interrupted.'
@@ -217,5 +626,14 @@ __extraopts__ = [
                  FoxgameOption('games', type='int'),
                  FoxgameOption('job', choices={'benchmark': BenchmarkJob,
                                                'none'      : NullJob}),
-                 FoxgameOption('looptime', type='float')
+                 FoxgameOption('looptime', type='float'),
+                 FoxgameOption('timestep', type='float'),
+                 FoxgameOption('reuse', type='bool'),
+                 FoxgameOption('workers', type='int'),
+                 FoxgameOption('ci', type='float'),
+                 FoxgameOption('rival'),
+                 FoxgameOption('confidence', type='float'),
+                 FoxgameOption('mingames', type='int'),
+                 FoxgameOption('result'),
+                 FoxgameOption('batch', type='int')
                 ]
@@ -0,0 +1,268 @@
+"""
+batch.py: a vectorized game engine playing many games at once (BATCH).
+"""
+from __future__ import division
+
+import numpy
+
+from foxgame.gamecore import Fox, Hare, Carrot
+
+import logging
+log = logging.getLogger('BATCH')
+
+
+def _compute_acc(dpoint, speed, pawncls):
+    """
+    Array version of MovingPawn._compute_acc: compute the acceleration
+    on every component accordingly to move intentions.
+    """
+    stop = numpy.where(speed > 0, -pawncls.brake,
+                       numpy.where(speed < 0, pawncls.brake, 0.0))
+    move = numpy.where(dpoint * speed >= 0,
+                       dpoint * pawncls.baccel,
+                       dpoint * pawncls.brake)
+    return numpy.where(dpoint == 0, stop, move)
+
+
+def _norm(vectors):
+    """
+    Return the euclidean norm of an array of vectors.
+    """
+    return numpy.hypot(vectors[..., 0], vectors[..., 1])
+
+
+def drive(pos, speed, directions, time_delta, size, pawncls):
+    """
+    Array version of MovingPawn.drive: return the new acceleration, speed
+    and position of an array of pawns of class pawncls.
+    """
+    # update acceleration
+    push = _compute_acc(directions, speed, pawncls)
+    pushnorm = _norm(push)
+    moving = pushnorm != 0
+    norm_factor = numpy.where(moving,
+                              max(pawncls.baccel, pawncls.brake) /
+                              numpy.where(moving, pushnorm, 1), 0)
+    acc = push * norm_factor[..., numpy.newaxis]
+
+    # update speed
+    speedup = speed + acc * time_delta
+    speednorm = _norm(speedup)
+    speed_norm = numpy.where(speednorm < pawncls.bspeed, 1,
+                             pawncls.bspeed /
+                             numpy.where(speednorm != 0, speednorm, 1))
+    speed = numpy.where(speedup * speed >= 0,
+                        speedup * speed_norm[..., numpy.newaxis], 0)
+
+    # update position
+    pos = pos + speed * time_delta
+    pos = numpy.maximum(pawncls.radius, pos)
+    pos = numpy.minimum(size - pawncls.radius, pos)
+
+    return acc, speed, pos
+
+
+def swept_collisions(start1, end1, start2, end2, radius):
+    """
+    Array version of gamecore.time_of_impact: return True where two circles
+    moving linearly from start to end positions get at radius distance.
+    """
+    rel = start1 - start2
+    move = (end1 - end2) - rel
+
+    c = (rel * rel).sum(axis=-1) - radius * radius
+    a = (move * move).sum(axis=-1)
+    b = (rel * move).sum(axis=-1)
+    disc = b * b - a * c
+
+    approaching = (a != 0) & (b < 0) & (disc >= 0)
+    # where not approaching the root is meaningless: use a safe denominator
+    toi = (-b - numpy.sqrt(numpy.where(approaching, disc, 0))) / \
+          numpy.where(approaching, a, 1)
+    return (c <= 0) | (approaching & (toi <= 1))
+
+
+class BatchGame(object):
+    """
+    Many independent games sharing the same arena size and number of foxes,
+    whose state is stored into NumPy arrays:
+     fox_pos, fox_speed, fox_acc    => shape (games, foxnum, 2)
+     hare_pos, hare_speed, hare_acc => shape (games, 2)
+     carrot_pos                     => shape (games, 2)
+     carrots, time_elapsed, playing => shape (games, )
+
+    Physics, wall clamping and collisions behave just like gamecore.Game.
+    """
+
+    # see gamecore.Game.swept
+    swept = True
+
+    def __init__(self, size, games, foxnum=1, seed=None):
+        """
+        Set up the arrays for 'games' games and place objects randomly.
+        """
+        self.size = numpy.array(size, dtype=float)
+        self.games = games
+        self.foxnum = foxnum
+
+        self.random = numpy.random.RandomState(seed)
+
+        self.fox_pos = numpy.zeros((games, foxnum, 2))
+        self.fox_speed = numpy.zeros((games, foxnum, 2))
+        self.fox_acc = numpy.zeros((games, foxnum, 2))
+
+        self.hare_pos = numpy.zeros((games, 2))
+        self.hare_speed = numpy.zeros((games, 2))
+        self.hare_acc = numpy.zeros((games, 2))
+
+        self.carrot_pos = numpy.zeros((games, 2))
+
+        self.carrots = numpy.zeros(games, dtype=int)
+        self.time_elapsed = numpy.zeros(games)
+        # games where the hare has not been caught yet
+        self.playing = numpy.ones(games, dtype=bool)
+
+        # place objects
+        self.place_carrots(self.playing)
+        self._randomlocate(_norm(self.size) / 4)
+
+    @classmethod
+    def from_games(cls, games):
+        """
+        Return a new BatchGame with the same state of a sequence of
+        gamecore.Game instances.
+        """
+        games = list(games)
+        first = games[0]
+        batch = cls(tuple(first.size), len(games), len(first.foxes))
+
+        for i, game in enumerate(games):
+            for j, fox in enumerate(game.foxes):
+                batch.fox_pos[i, j] = tuple(fox.pos)
+                batch.fox_speed[i, j] = tuple(fox.speed)
+                batch.fox_acc[i, j] = tuple(fox.acc)
+            batch.hare_pos[i] = tuple(game.hare.pos)
+            batch.hare_speed[i] = tuple(game.hare.speed)
+            batch.hare_acc[i] = tuple(game.hare.acc)
+            batch.carrot_pos[i] = tuple(game.carrot.pos)
+            batch.carrots[i] = game.hare.carrots
+            batch.time_elapsed[i] = game.time_elapsed
+
+        return batch
+
+    def _randompoints(self, num, wall_dist=0):
+        """
+        Return num random points in the arena at least wall_dist distant
+        from each wall.
+        """
+        low = numpy.array((wall_dist, wall_dist))
+        high = self.size - wall_dist
+        return numpy.floor(low + self.random.random_sample((num, 2)) *
+                           (high - low))
+
+    def _randomlocate(self, mindist):
+        """
+        Choose random positions for hares and foxes, as
+        gamecore.Game._randomlocate does: no fox is nearer than mindist
+        to the hare, and foxes nearer than mindist/4 to the ones already
+        placed are placed again, up to 2 retries per fox in each game.
+        """
+        self.hare_pos[:] = self._randompoints(self.games, Hare.radius)
+
+        # Fox-to-fox minimum distance
+        fox_dist = mindist / 4
+        # Fox-to-hare minimum distance
+        hare_dist = mindist
+        # retries left in each game for fox crowding avoiding
+        retries = numpy.empty(self.games, dtype=int)
+        retries.fill(2 * self.foxnum)
+
+        for fox in xrange(self.foxnum):
+            pos = self.fox_pos[:, fox]
+            retry = numpy.ones(self.games, dtype=bool)
+            while retry.any():
+                pos[retry] = self._randompoints(retry.sum(), Fox.radius)
+
+                near_hare = (_norm(pos - self.hare_pos) -
+                             Hare.radius - Fox.radius) < hare_dist
+                crowded = ((_norm(self.fox_pos[:, :fox] -
+                                  pos[:, numpy.newaxis]) -
+                            2 * Fox.radius) < fox_dist).any(axis=1)
+
+                retry = near_hare | ((retries > 0) & crowded)
+                retries -= retry & ~near_hare
+
+    def place_carrots(self, mask):
+        """
+        Place a new carrot in a random point in each game selected by mask.
+        """
+        self.carrot_pos[mask] = self._randompoints(mask.sum(), wall_dist=10)
+
+    @property
+    def collisions(self):
+        """
+        Return a boolean array, True where any fox collides with the hare.
+        """
+        dist = (_norm(self.hare_pos[:, numpy.newaxis] - self.fox_pos) -
+                Hare.radius - Fox.radius)
+        return (dist <= 0).any(axis=1)
+
+    @property
+    def carrot_collisions(self):
+        """
+        Return a boolean array, True where the hare collides with the carrot.
+        """
+        dist = (_norm(self.hare_pos - self.carrot_pos) -
+                Hare.radius - Carrot.radius)
+        return dist <= 0
+
+    def tick(self, time, fox_dirs, hare_dirs):
+        """
+        Update every game still playing according to the time and the
+        directions given, as gamecore.Game.tick does.
+
+        Return two boolean arrays: games where the hare has been caught
+        and games where the hare ate a carrot.
+        """
+        playing = self.playing
+        self.time_elapsed[playing] += time
+
+        # moves pawns
+        fox_dirs = numpy.asarray(fox_dirs)
+        hare_dirs = numpy.asarray(hare_dirs)
+        fox_start = self.fox_pos.copy()
+        hare_start = self.hare_pos.copy()
+
+        acc, speed, pos = drive(self.fox_pos[playing],
+                                self.fox_speed[playing],
+                                fox_dirs[playing], time, self.size, Fox)
+        self.fox_acc[playing] = acc
+        self.fox_speed[playing] = speed
+        self.fox_pos[playing] = pos
+
+        acc, speed, pos = drive(self.hare_pos[playing],
+                                self.hare_speed[playing],
+                                hare_dirs[playing], time, self.size, Hare)
+        self.hare_acc[playing] = acc
+        self.hare_speed[playing] = speed
+        self.hare_pos[playing] = pos
+
+        # check for collisions
+        caught = self.collisions
+        ate = self.carrot_collisions
+        if self.swept:
+            caught |= swept_collisions(hare_start[:, numpy.newaxis],
+                                       self.hare_pos[:, numpy.newaxis],
+                                       fox_start, self.fox_pos,
+                                       Hare.radius + Fox.radius).any(axis=1)
+            ate |= swept_collisions(hare_start, self.hare_pos,
+                                    self.carrot_pos, self.carrot_pos,
+                                    Hare.radius + Carrot.radius)
+        caught &= playing
+        ate &= playing & ~caught
+
+        self.playing = playing & ~caught
+        self.carrots[ate] += 1
+        self.place_carrots(ate)
+
+        return caught, ate
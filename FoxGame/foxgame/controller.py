@@ -2,6 +2,7 @@
 controller.py: basic classes for managing inputs (CTL).
 """
 from foxgame.structures import Direction
+from foxgame import instrument
 
 
 class Controller(object):
@@ -19,6 +20,16 @@ class Controller(object):
         self.brain = brain
         self.postfilters = postfilters
 
+        # the brain can decide together with brains of the same class
+        self.batched = getattr(brain, 'update_batch', None) is not None
+
+        # latency recorder, see foxgame.instrument
+        self.recorder = instrument.recorder
+        if self.recorder is not None:
+            self.names = [instrument.component_name('brain', brain)]
+            self.names.extend(instrument.component_name('postfilter', pfilter)
+                              for pfilter in postfilters)
+
         self.brain.start_game(self.pawn)
         for pfilter in self.postfilters:
             pfilter.start_game(self.pawn)
@@ -31,16 +42,55 @@ class Controller(object):
         Find the direction to follow using self.brain,
         then elaborates the output using postfilters.
         """
+        if self.recorder is not None:
+            return self._timed_update(time)
+
         # get the diorection from Brain
         dir = self.brain.update(time)
 
         # modify the direction using Postfilter
+        return self.filter(dir, time)
+
+    def filter(self, dir, time):
+        """
+        Elaborate the direction given by the brain using postfilters.
+        """
+        if self.recorder is not None:
+            timed = self.recorder.timed
+            for name, postfilter in zip(self.names[1:], self.postfilters):
+                dir = timed(name, postfilter.update, dir, time)
+            return dir
+
         for postfilter in self.postfilters:
             dir = postfilter.update(dir, time)
 
         # finally return the new direction
         return dir
 
+    def _timed_update(self, time):
+        """
+        Same as update, recording the latency of each component.
+        """
+        dir = self.recorder.timed(self.names[0], self.brain.update, time)
+        return self.filter(dir, time)
+
+    def end_episode(self):
+        """
+        Notify brain and postfilters that the current game is going to be
+        reset (see Game.reset).
+        """
+        self.brain.end_episode()
+        for postfilter in self.postfilters:
+            postfilter.end_episode()
+
+    def new_episode(self):
+        """
+        Notify brain and postfilters that the game has been reset.
+        """
+        self.brain.new_episode()
+        for postfilter in self.postfilters:
+            postfilter.new_episode()
+
     def destroy(self):
         self.brain.end_game()
         for postfilter in self.postfilters:
@@ -50,12 +100,56 @@ class Controller(object):
         self.pawn = None
 
 
+def decide(controllers, time):
+    """
+    Return the directions given by a sequence of controllers, even
+    of different games. Brains of the same class implementing
+    update_batch decide together with a single call.
+    """
+    dirs = [None] * len(controllers)
+
+    # brain class -> indexes of controllers
+    batches = {}
+    for i, controller in enumerate(controllers):
+        if controller.batched:
+            batches.setdefault(controller.brain.__class__, []).append(i)
+        else:
+            dirs[i] = controller.update(time)
+
+    for indexes in batches.itervalues():
+        if len(indexes) == 1:
+            dirs[indexes[0]] = controllers[indexes[0]].update(time)
+            continue
+
+        brains = [controllers[i].brain for i in indexes]
+        observations = [brain.observe() for brain in brains]
+        recorder = controllers[indexes[0]].recorder
+        if recorder is None:
+            batch = brains[0].update_batch(observations, time)
+        else:
+            # a single call for all the brains
+            batch = recorder.timed(controllers[indexes[0]].names[0] +
+                                   '[batch]', brains[0].update_batch,
+                                   observations, time)
+        for i, dir in zip(indexes, batch):
+            dirs[i] = controllers[i].filter(dir, time)
+
+    return dirs
+
+
 class Brain(object):
     """
     A Brain is.. [TODO]
     XXX: review.
     """
 
+    # optional method update_batch(self, observations, time): return
+    # the directions for a list of observations (see observe) of brains
+    # of this class, as their update methods would do. It may be called
+    # on any of them, so it can only be implemented by brains deciding
+    # the same way given the same observation.
+    update_batch = None
+
     def __init__(self):
         """
         Set up a new session,
@@ -94,6 +188,13 @@ class Brain(object):
         """
         raise NotImplementedError('update method not overwritten.')
 
+    def observe(self):
+        """
+        Return what the brain needs to know about the game in order to
+        decide its direction, as given to update_batch.
+        """
+        return None
+
     def set_up(self):
         """
         The method set_up is called when a new game is instantiated.
@@ -106,6 +207,22 @@ class Brain(object):
         """
         pass
 
+    def new_episode(self):
+        """
+        The method new_episode is called when the game is reset and
+        pawns are placed again, so the game starts again.
+        By default it calls set_up: override it to keep expensive state
+        (e.g. data loaded from files) between games.
+        """
+        self.set_up()
+
+    def end_episode(self):
+        """
+        The method end_episode is called when the game is going to be reset.
+        By default it calls tear_down.
+        """
+        self.tear_down()
+
     #########################################################################
     ## here starts common functions useful for an easy implementation of a ##
     ## new controller brain.                                               ##
@@ -130,8 +247,7 @@ class Brain(object):
         """
         Return the nearest fox respectively to the hare.
         """
-        return min(self.game.foxes,
-                   key=lambda x: x.pos.distance(self.game.hare.pos))
+        return self.game.observation.nearest_fox
 
 
 class PostFilter(object):
@@ -183,6 +299,22 @@ class PostFilter(object):
         """
         pass
 
+    def new_episode(self):
+        """
+        The method new_episode is called when the game is reset and
+        pawns are placed again, so the game starts again.
+        By default it calls set_up: override it to keep expensive state
+        (e.g. data loaded from files) between games.
+        """
+        self.set_up()
+
+    def end_episode(self):
+        """
+        The method end_episode is called when the game is going to be reset.
+        By default it calls tear_down.
+        """
+        self.tear_down()
+
     #########################################################################
     ## here starts common functions useful for an easy implementation of a ##
     ## new controller PostFilter.                                          ##
@@ -193,5 +325,4 @@ class PostFilter(object):
         """
         Return the nearest fox respectively to the hare.
         """
-        return min(self.game.foxes,
-                   key=lambda x: x.pos.distance(self.game.hare.pos))
+        return self.game.observation.nearest_fox
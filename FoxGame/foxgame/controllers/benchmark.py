@@ -1,4 +1,5 @@
 from sys import stdout
+import json
 
 from foxgame.structures import Direction
 from foxgame.options import FoxgameOption
@@ -26,6 +27,13 @@ def core_print(dst, data):
         print >> dst, '%s : %g;' % (key.rjust(12), val)
     print >> dst
 
+@staticmethod
+def json_print(dst, data):
+    """
+    Print data as a JSON record on a single line.
+    """
+    print >> dst, json.dumps(data, sort_keys=True)
+
 
 class Benchmark(PostFilter):
     """
@@ -71,7 +79,8 @@ class Benchmark(PostFilter):
 
 __extraopts__ = [FoxgameOption('formatter',
                                choices={'simple':simple_print,
-                                        'core':core_print}),
+                                        'core':core_print,
+                                        'json':json_print}),
                  FoxgameOption('dest')
                 ]
 
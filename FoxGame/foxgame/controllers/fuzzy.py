@@ -50,14 +50,17 @@ class HareBrain(Brain):
         Hare's aim is to get away from the fox, so it should go to the opposite
         position of the Fox.
         """
+        observation = self.game.observation
+        fox = observation.nearest_fox
+
         # normalize speed and distance
-        normdist = abs(self.pawn.distance(self.nearest_fox)) / 60
-        normspeed = abs(self.nearest_fox.speed.distance(self.pawn.speed)) / 100
+        normdist = abs(observation.nearest_distance) / 60
+        normspeed = abs(fox.speed.distance(self.pawn.speed)) / 100
 
         risk = self.engine.evaluate(proximity=normdist,
                                     speed=normspeed)['risk'].defuzzify()
         cdir = self.navigate(self.game.carrot.pos)
-        target = self.nearest_fox.pos + self.nearest_fox.speed/2
+        target = fox.pos + fox.speed/2
         fdir = -self.navigate(target)
 
         dir = Direction([(x+round(y*risk, 0)) if x != y else x
@@ -0,0 +1,153 @@
+"""
+ neuralnet/checkpoint.py: networks saved in background while learning.
+
+A brain learning while playing (e.g. rl.HareBrain) changes its network
+every game. Instead of saving it at the end of each game, it hands the
+network to the Checkpoint of its file: the next games get it from memory
+(see nn.cached_network), while a background thread saves it every few
+games or seconds, and when the process exits (pool workers included).
+Games never wait for disk.
+"""
+
+from __future__ import division
+
+from os.path import abspath
+from os import getpid
+from threading import Thread, Condition
+from timeit import default_timer as timer
+from multiprocessing.util import Finalize
+
+from nn import remember
+
+from logging import getLogger
+log = getLogger('[libs-neuralnetwork]')
+
+# absolute path -> Checkpoint, of the process _pid
+_checkpoints = {}
+_pid = None
+
+
+class Checkpoint(object):
+    """
+    Save the last network given to update into filename, in background,
+    every 'games' updates or 'interval' seconds (0 for never: only
+    on flush or when the process exits).
+    """
+
+    def __init__(self, filename, games=1, interval=0):
+        self.filename = filename
+        self.games = games
+        self.interval = interval
+
+        # last network given, not saved yet, and the updates since saved
+        self.latest = None
+        self.count = 0
+        self.last = timer()
+
+        # network waiting for the writer, and the writer thread if running
+        self._pending = None
+        # network the writer failed to save, retried by the next save
+        self._failed = None
+        self._condition = Condition()
+        self._writer = None
+
+    def update(self, network):
+        """
+        Take a copy of network, which later loads of the file will get,
+        and save it if due. Networks sharing the weights loaded from the
+        file (see NeuralNetwork.shared) didn't change: they are ignored.
+        """
+        if not (network.wi.flags.writeable or network.wo.flags.writeable):
+            return
+
+        self.latest = network.copy()
+        remember(self.filename, self.latest)
+        self.count += 1
+
+        if ((self.games and self.count >= self.games) or
+            (self.interval and timer() - self.last >= self.interval)):
+            self.save()
+
+    def save(self):
+        """
+        Hand the last network (or the last one which failed to be saved)
+        to the writer, without waiting for it.
+        """
+        with self._condition:
+            network = self.latest if self.latest is not None else self._failed
+            if network is None:
+                return
+            self._failed = None
+
+            # an older network still waiting is not saved at all
+            self._pending = network
+            if self._writer is None:
+                self._writer = Thread(target=self._write)
+                self._writer.daemon = True
+                self._writer.start()
+
+        self.latest = None
+        self.count = 0
+        self.last = timer()
+
+    def flush(self):
+        """
+        Save the last network, waiting for it to be written.
+        """
+        self.save()
+        with self._condition:
+            while self._writer is not None:
+                self._condition.wait()
+
+    def _write(self):
+        """
+        Save networks handed by save, one at a time, until none is left.
+        """
+        while True:
+            with self._condition:
+                if self._pending is None:
+                    # the next save starts another writer
+                    self._writer = None
+                    self._condition.notify_all()
+                    return
+                network, self._pending = self._pending, None
+
+            try:
+                # NeuralNetwork.save writes a temporary file, then renames it
+                network.save(self.filename)
+                log.debug('Checkpoint saved into %s' % self.filename)
+            except:
+                log.exception('Unable to save %s' % self.filename)
+                with self._condition:
+                    if self._pending is None:
+                        self._failed = network
+
+
+def checkpoint(filename, games=1, interval=0):
+    """
+    Return the Checkpoint of filename for this process, with the given
+    policy (see Checkpoint).
+    """
+    global _pid
+    if _pid != getpid():
+        # a new process: checkpoints of the one forking it aren't its own
+        _checkpoints.clear()
+        _pid = getpid()
+        # atexit doesn't run in pool workers, which leave with os._exit:
+        # multiprocessing runs finalizers in every process instead
+        Finalize(None, flush_checkpoints, exitpriority=10)
+
+    path = abspath(filename)
+    if path not in _checkpoints:
+        _checkpoints[path] = Checkpoint(filename)
+    _checkpoints[path].games = games
+    _checkpoints[path].interval = interval
+    return _checkpoints[path]
+
+
+def flush_checkpoints():
+    """
+    Save the networks not saved yet, waiting for them to be written.
+    """
+    for saved in _checkpoints.values():
+        saved.flush()
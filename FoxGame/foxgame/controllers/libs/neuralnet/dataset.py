@@ -0,0 +1,161 @@
+"""
+ neuralnet/dataset.py: training examples cached into binary files.
+
+Parsing examples (e.g. from CSV game logs) takes much longer than
+training on them: load_dataset parses them once, saving inputs and
+targets as raw arrays of doubles which later calls map in memory.
+"""
+
+from __future__ import division
+
+from os import getpid, makedirs, remove, rename, stat
+from os.path import abspath, exists
+from os.path import join as osjoin
+from itertools import izip
+from array import array
+import hashlib
+import json
+
+import numpy
+
+from logging import getLogger
+log = getLogger('[libs-neuralnetwork]')
+
+
+class ArrayDataset(object):
+    """
+    A sequence of (inputs, targets) examples, stored into two
+    2-dimensional arrays with an example for each row.
+    """
+
+    def __init__(self, inputs, targets):
+        if len(inputs) != len(targets):
+            raise ValueError('inputs and targets of different lengths')
+
+        self.inputs = inputs
+        self.targets = targets
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def __iter__(self):
+        """
+        Yield (inputs, targets) pairs of rows, as used by
+        NeuralNetwork.train.
+        """
+        return izip(self.inputs, self.targets)
+
+    def split(self, size):
+        """
+        Return a list of ArrayDatasets of at most size examples each,
+        sharing the arrays of this one.
+        """
+        return [ArrayDataset(self.inputs[start:start+size],
+                             self.targets[start:start+size])
+                for start in xrange(0, len(self), size)]
+
+    def batches(self, size):
+        """
+        Yield (inputs, targets) batches of at most size examples, as
+        nn.minibatches does. Batches are slices of the arrays, not copies.
+        """
+        for start in xrange(0, len(self), size):
+            yield (self.inputs[start:start+size],
+                   self.targets[start:start+size])
+
+
+def cache_key(paths, params):
+    """
+    Return a key which changes whenever the files in paths (their names,
+    sizes and modification times) or params change.
+    """
+    digest = hashlib.sha1(repr(params))
+    for path in paths:
+        info = stat(path)
+        digest.update('\0%s\0%d\0%r' % (abspath(path), info.st_size,
+                                        info.st_mtime))
+    return digest.hexdigest()
+
+
+def load_dataset(paths, parse, params, cachedir):
+    """
+    Return the ArrayDataset of the examples yielded by parse(path), as
+    (inputs, targets) pairs, for each file in paths. params must hold
+    whatever changes the examples built by parse.
+
+    Examples are parsed once and saved into cachedir: later calls for
+    the same files and params map the saved arrays in memory, read-only.
+    """
+    base = osjoin(cachedir, cache_key(paths, params))
+
+    try:
+        with open(base + '.json') as header:
+            shape = json.load(header)
+        log.debug('Loading %d cached examples from %s' % (shape['count'],
+                                                          base))
+    except IOError:
+        if not exists(cachedir):
+            makedirs(cachedir)
+        shape = _save(paths, parse, params, base)
+
+    return ArrayDataset(_map(base + '.inputs', shape['count'],
+                             shape['inputs']),
+                        _map(base + '.targets', shape['count'],
+                             shape['targets']))
+
+
+def _save(paths, parse, params, base):
+    """
+    Parse examples, writing inputs and targets to base.inputs and
+    base.targets; then write their shape to base.json and return it.
+    Files are written under temporary names and renamed when complete,
+    so processes parsing the same files at once don't hurt each other.
+    """
+    log.debug('Caching examples of %d files into %s' % (len(paths), base))
+    tmp = '.%d.tmp' % getpid()
+
+    shape = {'count': 0, 'inputs': 0, 'targets': 0, 'params': repr(params)}
+    with open(base + '.inputs' + tmp, 'wb') as inputs:
+        with open(base + '.targets' + tmp, 'wb') as targets:
+            for path in paths:
+                for data, target in parse(path):
+                    shape['inputs'] = len(data)
+                    shape['targets'] = len(target)
+                    array('d', data).tofile(inputs)
+                    array('d', target).tofile(targets)
+                    shape['count'] += 1
+
+    with open(base + '.json' + tmp, 'w') as header:
+        json.dump(shape, header)
+
+    # the header last: it tells the arrays are complete
+    for ext in ('.inputs', '.targets', '.json'):
+        _publish(base + ext + tmp, base + ext)
+
+    log.info('%d examples cached' % shape['count'])
+    return shape
+
+
+def _publish(tmp, filename):
+    """
+    Rename tmp to filename. On Windows, renames fail if filename exists:
+    then another process saved the same examples into it (and may have
+    mapped it already), so tmp is dropped.
+    """
+    try:
+        rename(tmp, filename)
+    except OSError:
+        if not exists(filename):
+            raise
+        remove(tmp)
+
+
+def _map(filename, count, width):
+    """
+    Map in memory the count x width array of doubles saved in filename.
+    """
+    if not count:
+        # empty files can't be mapped
+        return numpy.zeros((0, width))
+    return numpy.memmap(filename, dtype=numpy.float64, mode='r',
+                        shape=(count, width))
@@ -0,0 +1,156 @@
+"""
+ neuralnet/loader.py: shuffled training examples, read in background.
+
+A Loader reads examples from a list of sources (e.g. files) in a
+background thread, so that reading and parsing them overlap with
+training. Examples are shuffled through a bounded buffer and handed
+out in batches: memory use depends on the buffer size, not on the
+number of examples.
+"""
+
+from __future__ import division
+
+from threading import Thread, Event
+from Queue import Queue, Empty, Full
+from random import Random
+from itertools import izip
+import sys
+
+import numpy
+
+from logging import getLogger
+log = getLogger('[libs-neuralnetwork]')
+
+
+class _Failure(object):
+    """
+    An exception raised by the background thread.
+    """
+
+    def __init__(self, exc_info):
+        self.exc_info = exc_info
+
+
+class Loader(object):
+    """
+    Examples (inputs, targets) yielded by read(source) for each source,
+    in random order. Each iteration shuffles them again.
+    """
+
+    # seconds waited between checks that the consumer is still there
+    poll = 0.1
+    # examples passed at once to the thread iterating the loader
+    chunk = 64
+
+    def __init__(self, sources, read=iter, buffer_size=10000, prefetch=8,
+                 seed=0):
+        """
+        Arguments:
+         sources     are read in random order;
+         read        yields the examples of a source;
+         buffer_size is the number of examples shuffled together;
+         prefetch    is the number of batches ready before they are needed.
+        """
+        if buffer_size < 1:
+            raise ValueError('buffer_size must be positive')
+
+        self.sources = list(sources)
+        self.read = read
+        self.buffer_size = buffer_size
+        self.prefetch = prefetch
+        self.random = Random(seed)
+
+    def __iter__(self):
+        """
+        Yield single (inputs, targets) examples, as NeuralNetwork.train
+        does without batches.
+        """
+        for inputs, targets in self.batches(self.chunk):
+            for example in izip(inputs, targets):
+                yield example
+
+    def batches(self, size):
+        """
+        Yield (inputs, targets) batches of at most size examples, as
+        nn.minibatches does, while the next ones are read in background.
+        """
+        queue = Queue(self.prefetch)
+        stop = Event()
+        # seeded here: the thread must not share the generator
+        seed = self.random.random()
+        worker = Thread(target=self._produce, args=(queue, stop, size, seed))
+        worker.daemon = True
+        worker.start()
+
+        try:
+            while True:
+                try:
+                    # with a timeout, waiting can be interrupted
+                    batch = queue.get(timeout=self.poll)
+                except Empty:
+                    continue
+                if batch is None:
+                    break
+                if isinstance(batch, _Failure):
+                    raise batch.exc_info[0], batch.exc_info[1], \
+                          batch.exc_info[2]
+                yield batch
+        finally:
+            stop.set()
+            worker.join()
+
+    def _produce(self, queue, stop, size, seed):
+        """
+        Put batches into queue, then None; stop when stop is set.
+        """
+        def put(item):
+            while not stop.is_set():
+                try:
+                    queue.put(item, timeout=self.poll)
+                    return True
+                except Full:
+                    pass
+            return False
+
+        def arrays(examples):
+            return (numpy.array([data for data, target in examples],
+                                dtype=float),
+                    numpy.array([target for data, target in examples],
+                                dtype=float))
+
+        random = Random(seed)
+        try:
+            sources = self.sources[:]
+            random.shuffle(sources)
+
+            buffer = []
+            current = []
+            for source in sources:
+                for example in self.read(source):
+                    if len(buffer) < self.buffer_size:
+                        buffer.append(example)
+                        continue
+
+                    # hand out a random example, replacing it with the new one
+                    i = random.randrange(len(buffer))
+                    current.append(buffer[i])
+                    buffer[i] = example
+                    if len(current) == size:
+                        if not put(arrays(current)):
+                            return
+                        current = []
+
+            # last examples
+            random.shuffle(buffer)
+            for example in buffer:
+                current.append(example)
+                if len(current) == size:
+                    if not put(arrays(current)):
+                        return
+                    current = []
+            if current and not put(arrays(current)):
+                return
+            put(None)
+        except:
+            log.error('Unable to read training examples')
+            put(_Failure(sys.exc_info()))
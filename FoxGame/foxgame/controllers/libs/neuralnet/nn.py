@@ -5,81 +5,167 @@
 
 from __future__ import division
 
-from os.path import exists
+from os.path import abspath, exists
+from os import getpid, remove, rename, stat
+from threading import Lock
+import sys
 import shelve
 import anydbm
+import struct
+
+import numpy
 
 import tfuncts
 
 from logging import getLogger
 log = getLogger('[libs-neuralnetwork]')
 
-try:
-    import psyco
-    psyco.full()
-except ImportError:
-    log.critical('You should install psyco to speed up our neuralnet library.')
-
-# Use our own random generator so we can mess with its state
 from random import Random
-random_gen = Random()
-random = random_gen.random
-randomseed = random_gen.seed
+
+# binary format of network files (see NeuralNetwork.save): a header
+#  magic string, version, ni (bias included), nh, no, bias, funct name
+# followed by wi and wo, as little-endian doubles in row-major order
+MAGIC = 'FOXNNET\0'
+VERSION = 1
+HEADER = struct.Struct('<8s5I16s')
+# weights start at an offset aligned to their size
+OFFSET = 48
+DTYPE = numpy.dtype('<f8')
+
+# Windows can't rename over an existing file, nor remove a file mapped
+# in memory: there, network files are read instead of mapped
+WINDOWS = sys.platform == 'win32'
+
+# networks loaded by cached_network: absolute path -> (stamp, network),
+# the stamp being None for networks given by remember and not saved yet
+_networks = {}
+# networks are saved by background threads too (see checkpoint)
+_lock = Lock()
+
 
 def examples_list(ex_list):
     for line in ex_list:
         yield line
 
 
+def minibatches(examples, size):
+    """
+    Group (inputs, targets) examples into batches of at most size
+    examples. Yield (inputs, targets) pairs of 2-dimensional numpy arrays,
+    with an example for each row.
+    Examples already stored into arrays (see dataset.ArrayDataset)
+    are sliced, not copied.
+    """
+    if getattr(examples, 'batches', None) is not None:
+        for batch in examples.batches(size):
+            yield batch
+        return
+
+    inputs = []
+    targets = []
+    for data, target in examples:
+        inputs.append(data)
+        targets.append(target)
+        if len(inputs) == size:
+            yield numpy.array(inputs, dtype=float), \
+                  numpy.array(targets, dtype=float)
+            inputs = []
+            targets = []
+
+    if inputs:
+        yield numpy.array(inputs, dtype=float), \
+              numpy.array(targets, dtype=float)
+
+
 class NeuralNetwork(object):
     """
     A NeuralNetwork is a mathematical model who aims to reproduce
     human nervous system.
+
+    Weights are stored in numpy arrays: wi[i, j] connects the input i
+    to the hidden node j, wo[j, k] the hidden node j to the output k.
     """
 
     def __init__(self, ni, nh, no=2, bias=True, funct='sigmoid',
-                 wi=None, wo=None):
+                 wi=None, wo=None, seed=0):
         self.bias = int(bias)
 
-        randomseed(0)
+        # each network uses its own random generator, so building
+        # a network doesn't affect the others
+        self.random = Random(seed)
 
         # number of input, hidden, and output nodes
         self.ni = ni + self.bias # +1 for bias node
         self.nh = nh
         self.no = no
 
-        if wi and wo:
-            self.wi = wi
-            self.wo = wo
+        if wi is not None and wo is not None:
+            # arrays given (e.g. mapped by load_network) are not copied
+            self.wi = numpy.asarray(wi, dtype=float)
+            self.wo = numpy.asarray(wo, dtype=float)
         else:
             # create weights and set them into random values
-            self.wi = [[self._rand(-5, 5) for x in xrange(self.nh)]
-                                          for x in xrange(self.ni)]
-            self.wo = [[self._rand(-5, 5) for x in xrange(self.no)]
-                                          for x in xrange(self.nh)]
+            self.wi = numpy.array([[self._rand(-5, 5) for x in xrange(self.nh)]
+                                   for x in xrange(self.ni)])
+            self.wo = numpy.array([[self._rand(-5, 5) for x in xrange(self.no)]
+                                   for x in xrange(self.nh)])
+
+        if self.wi.shape != (self.ni, self.nh):
+            raise ValueError('wrong shape of input weights')
+        if self.wo.shape != (self.nh, self.no):
+            raise ValueError('wrong shape of output weights')
 
         self.funct_name = funct
         self.tfunct, self.dfunct = tfuncts.functions[funct]
 
-        # activations for nodes
-        self.ai = [1.0]*self.ni
-        self.ah = [1.0]*self.nh
-        self.ao = [1.0]*self.no
-
+        # activations for nodes; the bias node, if any, is the last input
+        self.ai = numpy.ones(self.ni)
+        self.ah = numpy.ones(self.nh)
+        self.ao = numpy.ones(self.no)
 
     def __repr__(self):
         return '<NeuralNetwork with inputs=%d, hidden=%d>' % (self.ni, self.nh)
 
     def __str__(self):
-        return ('Input weights: %s\n Hidden weights: %s\n' %
-                (', '.join(self.wi), ', '.join(self.wh)))
+        return ('Input weights: %s\n Output weights: %s\n' %
+                (self.wi.tolist(), self.wo.tolist()))
+
+    def shared(self, klass=None):
+        """
+        Return a network of class klass (by default, the same class)
+        sharing the weights of this one, read-only: they are copied
+        by the shared network only when it changes them (see own_weights).
+        """
+        wi = self.wi.view()
+        wo = self.wo.view()
+        wi.flags.writeable = wo.flags.writeable = False
+        return (klass or type(self))(self.ni - self.bias, self.nh, self.no,
+                                     self.bias, self.funct_name, wi, wo)
+
+    def copy(self):
+        """
+        Return a NeuralNetwork with a copy of the weights of this one.
+        """
+        return NeuralNetwork(self.ni - self.bias, self.nh, self.no,
+                             self.bias, self.funct_name,
+                             self.wi.copy(), self.wo.copy())
+
+    def own_weights(self):
+        """
+        Copy weights shared with other networks, so that they can be changed.
+        Methods changing weights call it first.
+        """
+        if not self.wi.flags.writeable:
+            self.wi = self.wi.copy()
+        if not self.wo.flags.writeable:
+            self.wo = self.wo.copy()
 
     def _rand(self, a, b):
         """
         Calculates a random number between a and b
         using the specified seed.
         """
-        return (b-a)*random() + a
+        return (b-a)*self.random.random() + a
 
     def put(self, inputs):
 
@@ -87,51 +173,84 @@ class NeuralNetwork(object):
             raise ValueError('wrong number of inputs')
 
         # input activations
-        self.ai[:-self.bias] = inputs
+        self.ai[:self.ni-self.bias] = inputs
 
-        # hidden activations
-        for j in xrange(self.nh):
-            self.ah[j] = self.tfunct(sum(
-                            [ai*wi[j] for ai, wi in zip(self.ai, self.wi)]))
+        # hidden and output activations
+        self.ah = self.tfunct(numpy.dot(self.ai, self.wi))
+        self.ao = self.tfunct(numpy.dot(self.ah, self.wo))
 
-        # output activations
-        for k in xrange(self.no):
-            self.ao[k] = self.tfunct(sum(
-                            [ah*wo[k] for ah, wo in zip(self.ah, self.wo)]))
+        return tuple(self.ao.tolist())
 
-        return tuple(self.ao)
+    def put_batch(self, inputs):
+        """
+        Return the outputs of the network for each inputs of a sequence,
+        as put does, computing them all at once.
+        Activations (used by back_propagate) are not changed.
+        """
+        ai = numpy.ones((len(inputs), self.ni))
+        ai[:, :self.ni-self.bias] = inputs
+        ah = self.tfunct(numpy.dot(ai, self.wi))
+        ao = self.tfunct(numpy.dot(ah, self.wo))
+
+        return [tuple(row) for row in ao.tolist()]
 
 
     def back_propagate(self, targets, eps=0.5):
         if len(targets) != self.no:
             raise ValueError('wrong number of target values')
 
+        errors = numpy.asarray(targets, dtype=float) - self.ao
+
         # Input delta
-        output_deltas = [(targets[k]-ao) * self.dfunct(ao)
-                         for k, ao in enumerate(self.ao)]
+        output_deltas = errors * self.dfunct(self.ao)
 
         # Hidden delta
-        hidden_deltas = []
-        for j in xrange(self.nh):
-            hidden_deltas.append(
-                            self.dfunct(self.ah[j]) * sum(
-                            od*w for od, w in zip(output_deltas, self.wo[j])))
+        hidden_deltas = self.dfunct(self.ah) * numpy.dot(self.wo,
+                                                         output_deltas)
 
+        self.own_weights()
         # Weights between hidden and output
-        for j in xrange(self.nh):
-            for k in xrange(self.no):
-                self.wo[j][k] += eps * output_deltas[k] * self.ah[j]
+        self.wo += eps * numpy.outer(self.ah, output_deltas)
 
         # Weights between input and hidden
-        for i in xrange(self.ni):
-            for j in xrange(self.nh):
-                self.wi[i][j] += eps * hidden_deltas[j] * self.ai[i]
+        self.wi += eps * numpy.outer(self.ai, hidden_deltas)
 
         # Medium quadratic error
-        return sum((t-ao)**2 / 2 for t, ao in zip(targets, self.ao))
+        return float(numpy.dot(errors, errors) / 2)
+
+    def back_propagate_batch(self, inputs, targets, eps=0.5):
+        """
+        Update weights once for a batch of examples (see minibatches),
+        following the mean gradient of their errors.
+        Return the sum of their quadratic errors, as back_propagate does.
+        Activations are not changed.
+        """
+        if targets.shape[1] != self.no:
+            raise ValueError('wrong number of target values')
+
+        ai = numpy.ones((len(inputs), self.ni))
+        ai[:, :self.ni-self.bias] = inputs
+        ah = self.tfunct(numpy.dot(ai, self.wi))
+        ao = self.tfunct(numpy.dot(ah, self.wo))
+        errors = targets - ao
 
-    def train(self, gen_funct, ex_element, iterations=1000, eps=0.3, des_err=None):
+        # deltas, a row for each example
+        output_deltas = errors * self.dfunct(ao)
+        hidden_deltas = self.dfunct(ah) * numpy.dot(output_deltas, self.wo.T)
+
+        rate = eps / len(inputs)
+        self.own_weights()
+        self.wo += rate * numpy.dot(ah.T, output_deltas)
+        self.wi += rate * numpy.dot(ai.T, hidden_deltas)
+
+        return float((errors**2).sum() / 2)
+
+    def train(self, gen_funct, ex_element, iterations=1000, eps=0.3, des_err=None,
+              batch_size=1):
         # eps: learning rate
+        # batch_size: examples used for each update of the weights
+        # gen_funct(ex_element) yields examples, or ex_element holds them
+        # if gen_funct is None
         epoch = 0
 
         # define error for first iteration
@@ -144,10 +263,19 @@ class NeuralNetwork(object):
                (not des_err and epoch < iterations)):
             epoch += 1
 
+            if gen_funct is None:
+                examples = ex_element
+            else:
+                examples = gen_funct(ex_element)
+
             error = 0
-            for inputs, targets in gen_funct(ex_element):
-                self.put(inputs)
-                error += self.back_propagate(targets, eps)
+            if batch_size > 1:
+                for inputs, targets in minibatches(examples, batch_size):
+                    error += self.back_propagate_batch(inputs, targets, eps)
+            else:
+                for inputs, targets in examples:
+                    self.put(inputs)
+                    error += self.back_propagate(targets, eps)
 
             if epoch % 2 == 0:
                 log.info('error: %f on epoch %d' % (error, epoch))
@@ -159,24 +287,144 @@ class NeuralNetwork(object):
 
     def save(self, filename):
         """
-        Save a shelve db with synapses.
-         The dictionary saved follow this structure:
-           wi    -> [list  : weights in inputs-hiddens]
-           wo    -> [list  : weights in hiddens-output]
-           funct -> [string: transfer function's name]
-           bias  -> [int   : bias node]
+        Save synapses into a binary file (see MAGIC and HEADER).
+        The file is written under a temporary name and then renamed,
+        so it is never left half written.
         """
-        db = shelve.open(filename, 'n')
+        tmp = '%s.%d.tmp' % (filename, getpid())
+        with open(tmp, 'wb') as out:
+            out.write(HEADER.pack(MAGIC, VERSION, self.ni, self.nh, self.no,
+                                  self.bias, self.funct_name))
+            out.write('\0' * (OFFSET - HEADER.size))
+            out.write(numpy.ascontiguousarray(self.wi, DTYPE).tostring())
+            out.write(numpy.ascontiguousarray(self.wo, DTYPE).tostring())
+        _replace(tmp, filename)
+
+        # networks cached from this file are now this one, unless
+        # a newer one has been remembered meanwhile
+        path = abspath(filename)
+        with _lock:
+            if path in _networks:
+                stamp, network = _networks[path]
+                if network is self:
+                    _networks[path] = (_stamp(path), self)
+                elif stamp is not None:
+                    _networks[path] = (_stamp(path), self.copy())
+
+
+def _replace(source, dest):
+    """
+    Rename the file source to dest, replacing dest if it exists:
+    atomically on POSIX, after removing dest on Windows.
+    """
+    if WINDOWS and exists(dest):
+        remove(dest)
+    rename(source, dest)
 
-        db['wi'] = self.wi
-        db['wo'] = self.wo
-        db['funct'] = self.funct_name
-        db['bias'] = self.bias
 
-        db.close()
+def is_binary(filename):
+    """
+    Return True if filename is a network saved in the binary format.
+    """
+    try:
+        with open(filename, 'rb') as data:
+            return data.read(len(MAGIC)) == MAGIC
+    except IOError:
+        return False
 
 
 def load_network(filename, klass=NeuralNetwork):
+    """
+    Load synapses from a file saved in the binary format, or from
+    a shelve database saved by older versions.
+    Binary files are mapped in memory, not read (but on Windows): pages
+    are copied only when weights change, and changes are never written
+    to the file.
+    """
+    if not is_binary(filename):
+        return _load_shelve(filename, klass)
+
+    with open(filename, 'rb') as data:
+        header = data.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise IOError('Network file truncated')
+    magic, version, ni, nh, no, bias, funct = HEADER.unpack(header)
+    if version != VERSION:
+        raise IOError('Unknown network file version %d' % version)
+    funct = funct.rstrip('\0')
+
+    size = ni*nh + nh*no
+    if WINDOWS:
+        with open(filename, 'rb') as data:
+            data.seek(OFFSET)
+            weights = numpy.fromfile(data, dtype=DTYPE, count=size)
+        if len(weights) < size:
+            raise IOError('Network file truncated')
+    else:
+        weights = numpy.memmap(filename, dtype=DTYPE, mode='c',
+                               offset=OFFSET, shape=(size, ))
+    wi = weights[:ni*nh].reshape(ni, nh)
+    wo = weights[ni*nh:].reshape(nh, no)
+    log.debug('Loading network with '
+              'ni=%d, no=%d, nh=%d, bias=%d, funct=%s' % (
+               ni - bias, no, nh, bias, funct))
+
+    return klass(ni - bias, nh, no, bias, funct, wi, wo)
+
+
+def cached_network(filename, klass=NeuralNetwork):
+    """
+    Return the network saved in filename, as load_network does, loading
+    it only if the file changed since its last load in this process.
+    Networks returned share their weights until they change them
+    (see NeuralNetwork.shared), so one can't change the others.
+    """
+    path = abspath(filename)
+    with _lock:
+        if path in _networks and _networks[path][0] is None:
+            # remembered, newer than the file
+            return _networks[path][1].shared(klass)
+
+        try:
+            stamp = _stamp(path)
+        except OSError:
+            # e.g. a shelve database, saved into files with other names
+            return load_network(filename, klass)
+
+        if path not in _networks or _networks[path][0] != stamp:
+            _networks[path] = (stamp, load_network(filename))
+        return _networks[path][1].shared(klass)
+
+
+def remember(filename, network):
+    """
+    Make cached_network return network for filename, until a network
+    is saved into it. The network must not change (e.g. give a copy).
+    """
+    with _lock:
+        _networks[abspath(filename)] = (None, network)
+
+
+def _stamp(path):
+    """
+    Return what changes when a network file is saved again.
+    """
+    info = stat(path)
+    # save replaces the file: its inode changes too
+    return info.st_ino, info.st_mtime, info.st_size
+
+
+def convert_network(source, dest=None):
+    """
+    Save the network of source, usually a shelve database, into dest
+    (by default, source itself) in the binary format. Return the network.
+    """
+    network = load_network(source)
+    network.save(source if dest is None else dest)
+    return network
+
+
+def _load_shelve(filename, klass):
     """
     Load a shelve database with synapses.
     """
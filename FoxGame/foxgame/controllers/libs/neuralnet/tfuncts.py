@@ -1,9 +1,11 @@
 """
 neuralnet/tfuncts.py: some of the most common transfer functions
                       for neuralnetworks.
+                      They work on numbers and on numpy arrays.
 """
 from __future__ import division
-from math import e, tanh
+
+import numpy
 
 
 #HYPERBOLIC TANGENT
@@ -11,7 +13,7 @@ def tanh_function(x):
     """
     Hyperbolic tangent - transfer function
     """
-    return tanh(x)
+    return numpy.tanh(x)
 
 def tanh_derived(y):
     """
@@ -25,7 +27,7 @@ def sigmoid_function(x):
     """
     Sigmoid - Transfer function
     """
-    return 1.0 / (1.0 + e**(-x))
+    return 1.0 / (1.0 + numpy.exp(-x))
 
 def sigmoid_derived(y):
     """
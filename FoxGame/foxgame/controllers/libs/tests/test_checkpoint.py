@@ -0,0 +1,126 @@
+from unittest import TestCase
+from tempfile import mkdtemp
+from shutil import rmtree
+from os import mkdir
+from os.path import exists
+from os.path import join as osjoin
+from multiprocessing import Pool
+import logging
+from foxgame.controllers.libs.neuralnet.nn import (NeuralNetwork, load_network,
+                                                   cached_network)
+from foxgame.controllers.libs.neuralnet.checkpoint import (Checkpoint,
+                                                           checkpoint)
+
+
+def learn_in_worker(filename):
+    """
+    Give a checkpoint a network not due to be saved yet.
+    """
+    network = NeuralNetwork(3, 4, 2, True, 'tanh', seed=5)
+    checkpoint(filename, games=10).update(network)
+    return network.wi.tolist()
+
+
+class TestCheckpoint(TestCase):
+    """
+    Test networks saved in background.
+    """
+
+    def setUp(self):
+        self.path = mkdtemp()
+        self.filename = osjoin(self.path, 'net.db')
+        self.network = NeuralNetwork(3, 4, 2, True, 'tanh', seed=5)
+
+    def tearDown(self):
+        rmtree(self.path)
+
+    def learn(self):
+        self.network.train(None, [((1, 2, 3), (0, 1))], iterations=1)
+
+    def test_games(self):
+        """
+        Networks are saved every 'games' updates, and loaded from memory
+        meanwhile.
+        """
+        saved = Checkpoint(self.filename, games=2)
+        saved.update(self.network)
+        self.assertTrue(saved.latest is not None)
+        self.assertFalse(exists(self.filename))
+        self.assertEqual(cached_network(self.filename).wi.tolist(),
+                         self.network.wi.tolist())
+
+        self.learn()
+        saved.update(self.network)
+        saved.flush()
+        self.assertEqual(load_network(self.filename).wi.tolist(),
+                         self.network.wi.tolist())
+
+    def test_copy(self):
+        """
+        Changes after an update are not saved.
+        """
+        saved = Checkpoint(self.filename, games=0)
+        saved.update(self.network)
+        weights = self.network.wi.tolist()
+        self.learn()
+        saved.flush()
+
+        self.assertEqual(load_network(self.filename).wi.tolist(), weights)
+        self.assertEqual(cached_network(self.filename).wi.tolist(), weights)
+
+    def test_interval(self):
+        saved = Checkpoint(self.filename, games=0, interval=1e-9)
+        saved.update(self.network)
+        saved.flush()
+        self.assertTrue(exists(self.filename))
+
+    def test_unchanged(self):
+        """
+        Networks sharing the weights of the file are not saved again.
+        """
+        self.network.save(self.filename)
+        network = cached_network(self.filename)
+        saved = Checkpoint(self.filename)
+        saved.update(network)
+        self.assertTrue(saved.latest is None)
+
+        network.train(None, [((1, 2, 3), (0, 1))], iterations=1)
+        saved.update(network)
+        saved.flush()
+        self.assertEqual(load_network(self.filename).wi.tolist(),
+                         network.wi.tolist())
+
+    def test_retry(self):
+        """
+        A network which failed to be saved is saved by the next flush.
+        """
+        filename = osjoin(self.path, 'missing', 'net.db')
+        saved = Checkpoint(filename)
+        logging.disable(logging.CRITICAL)
+        try:
+            saved.update(self.network)
+            saved.flush()
+        finally:
+            logging.disable(logging.NOTSET)
+        self.assertFalse(exists(filename))
+
+        mkdir(osjoin(self.path, 'missing'))
+        saved.flush()
+        self.assertEqual(load_network(filename).wi.tolist(),
+                         self.network.wi.tolist())
+
+    def test_pool(self):
+        """
+        Pool workers save their networks when they exit.
+        """
+        pool = Pool(1)
+        try:
+            weights = pool.apply(learn_in_worker, (self.filename, ))
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+        self.assertEqual(load_network(self.filename).wi.tolist(), weights)
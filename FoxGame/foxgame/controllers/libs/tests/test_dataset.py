@@ -0,0 +1,116 @@
+from unittest import TestCase
+from tempfile import mkdtemp
+from shutil import rmtree
+from os import listdir, utime
+from os.path import exists
+from os.path import join as osjoin
+import numpy
+
+from foxgame.controllers.libs.neuralnet import dataset as datasetmodule
+from foxgame.controllers.libs.neuralnet.dataset import (ArrayDataset,
+                                                        load_dataset)
+from foxgame.controllers.libs.neuralnet.nn import minibatches
+
+
+class TestDataset(TestCase):
+    """
+    Test cached datasets.
+    """
+
+    def setUp(self):
+        self.dir = mkdtemp()
+        self.cache = osjoin(self.dir, 'cache')
+        self.paths = []
+        for name, rows in (('a', 3), ('b', 2)):
+            path = osjoin(self.dir, name)
+            with open(path, 'w') as out:
+                for i in xrange(rows):
+                    print >> out, i
+            self.paths.append(path)
+        self.parsed = []
+
+    def tearDown(self):
+        rmtree(self.dir)
+
+    def parse(self, path):
+        self.parsed.append(path)
+        for line in open(path):
+            value = int(line)
+            yield (value, value * 2), (value + 0.5, )
+
+    def test_load(self):
+        dataset = load_dataset(self.paths, self.parse, (1, ), self.cache)
+
+        self.assertEqual(len(dataset), 5)
+        self.assertEqual(dataset.inputs.tolist(),
+                         [[0, 0], [1, 2], [2, 4], [0, 0], [1, 2]])
+        self.assertEqual(dataset.targets[:, 0].tolist(),
+                         [0.5, 1.5, 2.5, 0.5, 1.5])
+        self.assertEqual([list(data) for data, target in dataset][2], [2, 4])
+        self.assertTrue(isinstance(dataset.inputs, numpy.memmap))
+
+    def test_cache(self):
+        load_dataset(self.paths, self.parse, (1, ), self.cache)
+        self.assertEqual(len(self.parsed), 2)
+
+        # same files and parameters: read from the cache
+        dataset = load_dataset(self.paths, self.parse, (1, ), self.cache)
+        self.assertEqual(len(self.parsed), 2)
+        self.assertEqual(len(dataset), 5)
+
+        # other parameters
+        load_dataset(self.paths, self.parse, (2, ), self.cache)
+        self.assertEqual(len(self.parsed), 4)
+
+        # a file changed
+        utime(self.paths[0], (0, 0))
+        load_dataset(self.paths, self.parse, (1, ), self.cache)
+        self.assertEqual(len(self.parsed), 6)
+
+        self.assertFalse([name for name in listdir(self.cache)
+                          if name.endswith('.tmp')])
+
+    def test_cached_meanwhile(self):
+        """
+        Examples cached by another process meanwhile are kept, as on
+        Windows, where renames can't replace files.
+        """
+        load_dataset(self.paths, self.parse, (1, ), self.cache)
+
+        def rename(source, dest):
+            if exists(dest):
+                raise OSError('file exists')
+        saved = datasetmodule.rename
+        datasetmodule.rename = rename
+        try:
+            for name in listdir(self.cache):
+                if name.endswith('.json'):
+                    header = osjoin(self.cache, name)
+            datasetmodule._save(self.paths, self.parse, (1, ),
+                                header[:-len('.json')])
+        finally:
+            datasetmodule.rename = saved
+
+        self.assertEqual(len(listdir(self.cache)), 3)
+        dataset = load_dataset(self.paths, self.parse, (1, ), self.cache)
+        self.assertEqual(len(dataset), 5)
+
+    def test_batches(self):
+        dataset = load_dataset(self.paths, self.parse, (1, ), self.cache)
+        batches = list(minibatches(dataset, 2))
+
+        self.assertEqual([len(inputs) for inputs, targets in batches],
+                         [2, 2, 1])
+        for inputs, targets in batches:
+            self.assertTrue(numpy.may_share_memory(inputs, dataset.inputs))
+        self.assertEqual(batches[1][1].tolist(), [[2.5], [0.5]])
+
+    def test_empty(self):
+        dataset = load_dataset(self.paths, lambda path: iter(()), (1, ),
+                               self.cache)
+        self.assertEqual(len(dataset), 0)
+        self.assertEqual(list(minibatches(dataset, 2)), [])
+
+    def test_lengths(self):
+        self.assertRaises(ValueError, ArrayDataset,
+                          numpy.zeros((2, 1)), numpy.zeros((3, 1)))
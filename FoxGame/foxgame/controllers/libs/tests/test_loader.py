@@ -0,0 +1,63 @@
+from unittest import TestCase
+from threading import active_count
+
+from foxgame.controllers.libs.neuralnet.loader import Loader
+
+
+def read(source):
+    """
+    Examples of a source: a range of numbers.
+    """
+    start, stop = source
+    for i in xrange(start, stop):
+        yield (i, -i), (i % 2, )
+
+
+class TestLoader(TestCase):
+    """
+    Test the background loader.
+    """
+
+    def setUp(self):
+        self.sources = [(0, 40), (40, 45), (45, 100)]
+
+    def test_examples(self):
+        loader = Loader(self.sources, read, buffer_size=10)
+        values = [int(data[0]) for data, target in loader]
+
+        self.assertEqual(sorted(values), range(100))
+        self.assertNotEqual(values, range(100))
+        # shuffled again each time
+        self.assertNotEqual([int(data[0]) for data, target in loader],
+                            values)
+
+    def test_batches(self):
+        loader = Loader(self.sources, read, buffer_size=10)
+        batches = list(loader.batches(32))
+
+        self.assertEqual([len(inputs) for inputs, targets in batches],
+                         [32, 32, 32, 4])
+        for inputs, targets in batches:
+            self.assertEqual(inputs.shape[1], 2)
+            self.assertEqual((inputs[:, 0] == -inputs[:, 1]).all(), True)
+            self.assertEqual((inputs[:, 0] % 2 == targets[:, 0]).all(), True)
+
+    def test_seed(self):
+        first = [data[0] for data, target in Loader(self.sources, read, 10)]
+        second = [data[0] for data, target in Loader(self.sources, read, 10)]
+        self.assertEqual(first, second)
+
+    def test_stop(self):
+        threads = active_count()
+        loader = Loader(self.sources, read, buffer_size=10, prefetch=1)
+        for batch in loader.batches(1):
+            break
+        self.assertEqual(active_count(), threads)
+
+    def test_failure(self):
+        def fail(source):
+            yield (0, 0), (0, )
+            raise IOError('unreadable')
+
+        loader = Loader(self.sources, fail, buffer_size=10)
+        self.assertRaises(IOError, list, loader)
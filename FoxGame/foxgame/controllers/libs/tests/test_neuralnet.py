@@ -1,5 +1,24 @@
 from unittest import TestCase
-from foxgame.controllers.libs.neuralnet.nn import NeuralNetwork, examples_list
+from tempfile import mkdtemp
+from shutil import rmtree
+from os.path import join as osjoin
+import shelve
+import mmap
+import numpy
+from foxgame.controllers.libs.neuralnet import nn
+from foxgame.controllers.libs.neuralnet.nn import (NeuralNetwork, load_network,
+                                                   cached_network,
+                                                   convert_network, is_binary,
+                                                   examples_list, minibatches)
+
+
+def mapped(weights):
+    """
+    Return True if the array weights is a view of a file mapped in memory.
+    """
+    while isinstance(weights, numpy.ndarray):
+        weights = weights.base
+    return isinstance(weights, mmap.mmap)
 
 
 class TestNeuralNetwork(TestCase):
@@ -82,3 +101,216 @@ class TestNeuralNetwork(TestCase):
 
         # It checks the value using the relative error
         self.assertTrue((abs(r_value-err) / r_value) < self.error_threshold)
+
+    def test_put_batch(self):
+        n = NeuralNetwork(3, 5, 2, True, 'tanh', seed=2)
+        inputs = [(0, 0, 0), (1, -1, 0.5), (0.3, 0.2, -0.9)]
+
+        outputs = n.put_batch(inputs)
+        self.assertEqual(len(outputs), 3)
+        for data, batch in zip(inputs, outputs):
+            for single, value in zip(n.put(data), batch):
+                self.assertAlmostEqual(single, value)
+
+    def test_back_propagate(self):
+        """
+        Compare a training step with the plain definition of
+        back-propagation.
+        """
+        n = NeuralNetwork(3, 4, 2, True, 'sigmoid', seed=3)
+        wi, wo = n.wi.tolist(), n.wo.tolist()
+        inputs, targets, eps = (0.5, -0.2, 0.8), (0.1, 0.9), 0.3
+
+        ai = list(inputs) + [1.0]
+        ah = [n.tfunct(sum(ai[i] * wi[i][j] for i in xrange(4)))
+              for j in xrange(4)]
+        ao = [n.tfunct(sum(ah[j] * wo[j][k] for j in xrange(4)))
+              for k in xrange(2)]
+        odeltas = [(targets[k] - ao[k]) * n.dfunct(ao[k]) for k in xrange(2)]
+        hdeltas = [n.dfunct(ah[j]) * sum(odeltas[k] * wo[j][k]
+                                         for k in xrange(2))
+                   for j in xrange(4)]
+
+        for single, value in zip(n.put(inputs), ao):
+            self.assertAlmostEqual(single, value)
+        error = n.back_propagate(targets, eps)
+        self.assertAlmostEqual(error, sum((t - o)**2 / 2
+                                          for t, o in zip(targets, ao)))
+        for j in xrange(4):
+            for k in xrange(2):
+                self.assertAlmostEqual(n.wo[j, k],
+                                       wo[j][k] + eps * odeltas[k] * ah[j])
+        for i in xrange(4):
+            for j in xrange(4):
+                self.assertAlmostEqual(n.wi[i, j],
+                                       wi[i][j] + eps * hdeltas[j] * ai[i])
+
+    def test_no_bias(self):
+        n = NeuralNetwork(2, 3, 1, False)
+        first = n.put((0.2, 0.4))
+        n.put((1, 1))
+        self.assertEqual(len(n.ai), 2)
+        self.assertEqual(n.put((0.2, 0.4)), first)
+
+    def test_save(self):
+        path = mkdtemp()
+        try:
+            n = NeuralNetwork(3, 4, 2, True, 'tanh', seed=5)
+            n.save(osjoin(path, 'net.db'))
+            loaded = load_network(osjoin(path, 'net.db'))
+        finally:
+            rmtree(path)
+
+        self.assertEqual(loaded.wi.tolist(), n.wi.tolist())
+        self.assertEqual(loaded.wo.tolist(), n.wo.tolist())
+        self.assertEqual(loaded.put((1, 2, 3)), n.put((1, 2, 3)))
+
+    def test_mapped_weights(self):
+        """
+        Weights are mapped from the file: changing them leaves it alone.
+        """
+        path = mkdtemp()
+        try:
+            filename = osjoin(path, 'net.db')
+            NeuralNetwork(3, 4, 2, True, 'tanh', seed=5).save(filename)
+            self.assertTrue(is_binary(filename))
+
+            n = load_network(filename)
+            self.assertTrue(mapped(n.wi))
+            original = n.wi.tolist()
+            n.train(None, [((1, 2, 3), (0, 1))], iterations=3)
+            self.assertNotEqual(n.wi.tolist(), original)
+
+            self.assertEqual(load_network(filename).wi.tolist(), original)
+        finally:
+            rmtree(path)
+
+    def test_windows(self):
+        """
+        On Windows, networks are read, not mapped, and saved over
+        existing files by removing them first.
+        """
+        path = mkdtemp()
+        nn.WINDOWS = True
+        try:
+            filename = osjoin(path, 'net.db')
+            NeuralNetwork(3, 4, 2, True, 'tanh', seed=5).save(filename)
+            self.assertFalse(mapped(load_network(filename).wi))
+
+            other = NeuralNetwork(3, 4, 2, True, 'tanh', seed=6)
+            other.save(filename)
+            self.assertEqual(load_network(filename).wi.tolist(),
+                             other.wi.tolist())
+        finally:
+            nn.WINDOWS = False
+            rmtree(path)
+
+    def test_convert_shelve(self):
+        """
+        Networks saved by older versions into shelve databases are
+        loaded, and converted to the binary format.
+        """
+        path = mkdtemp()
+        try:
+            n = NeuralNetwork(3, 4, 2, True, 'tanh', seed=5)
+            filename = osjoin(path, 'net.db')
+            db = shelve.open(filename, 'n')
+            db['wi'] = n.wi.tolist()
+            db['wo'] = n.wo.tolist()
+            db['funct'] = 'tanh'
+            db['bias'] = 1
+            db.close()
+            self.assertFalse(is_binary(filename))
+
+            legacy = load_network(filename)
+            self.assertEqual(legacy.wi.tolist(), n.wi.tolist())
+
+            convert_network(filename, osjoin(path, 'new.db'))
+            self.assertTrue(is_binary(osjoin(path, 'new.db')))
+            loaded = load_network(osjoin(path, 'new.db'))
+        finally:
+            rmtree(path)
+
+        self.assertEqual(loaded.funct_name, 'tanh')
+        self.assertEqual(loaded.bias, 1)
+        self.assertEqual(loaded.wo.tolist(), n.wo.tolist())
+        self.assertEqual(loaded.put((1, 2, 3)), n.put((1, 2, 3)))
+
+    def test_cached_network(self):
+        """
+        A file is loaded once while unchanged; networks loaded from it
+        don't see each other's changes.
+        """
+        path = mkdtemp()
+        try:
+            filename = osjoin(path, 'net.db')
+            NeuralNetwork(3, 4, 2, True, 'tanh', seed=5).save(filename)
+
+            first = cached_network(filename)
+            second = cached_network(filename)
+            self.assertTrue(first.wi.base is second.wi.base)
+            original = second.wi.tolist()
+
+            first.train(None, [((1, 2, 3), (0, 1))], iterations=3)
+            self.assertNotEqual(first.wi.tolist(), original)
+            self.assertEqual(second.wi.tolist(), original)
+            self.assertEqual(cached_network(filename).wi.tolist(), original)
+
+            # saving replaces the cached network
+            first.save(filename)
+            self.assertEqual(cached_network(filename).wi.tolist(),
+                             first.wi.tolist())
+            other = NeuralNetwork(3, 4, 2, True, 'tanh', seed=6)
+            other.save(filename)
+            self.assertEqual(cached_network(filename).put((1, 2, 3)),
+                             other.put((1, 2, 3)))
+        finally:
+            rmtree(path)
+
+    def test_minibatches(self):
+        examples = [((i, i), (i, )) for i in xrange(5)]
+        batches = list(minibatches(examples, 2))
+
+        self.assertEqual([len(inputs) for inputs, targets in batches],
+                         [2, 2, 1])
+        self.assertEqual(batches[2][0].tolist(), [[4, 4]])
+        self.assertEqual(batches[2][1].tolist(), [[4]])
+
+    def test_back_propagate_batch(self):
+        """
+        A batch moves weights by the mean of the updates of its examples.
+        """
+        inputs = [(0.5, -0.2, 0.8), (0.1, 0.4, -0.6)]
+        targets = [(0.1, 0.9), (0.7, 0.2)]
+        n = NeuralNetwork(3, 4, 2, True, 'sigmoid', seed=3)
+        start = n.wi.copy(), n.wo.copy()
+
+        # each example alone, from the same starting weights
+        error = 0
+        steps = []
+        for data, target in zip(inputs, targets):
+            n.wi, n.wo = start[0].copy(), start[1].copy()
+            n.put(data)
+            error += n.back_propagate(target, 0.3)
+            steps.append((n.wi - start[0], n.wo - start[1]))
+
+        n.wi, n.wo = start[0].copy(), start[1].copy()
+        (batch_inputs, batch_targets), = minibatches(zip(inputs, targets), 2)
+        self.assertAlmostEqual(n.back_propagate_batch(batch_inputs,
+                                                      batch_targets, 0.3),
+                               error)
+        self.assertTrue(numpy.allclose(n.wi - start[0],
+                                       (steps[0][0] + steps[1][0]) / 2))
+        self.assertTrue(numpy.allclose(n.wo - start[1],
+                                       (steps[0][1] + steps[1][1]) / 2))
+
+    def test_train_batch(self):
+        or_pat = (((0, 0), (0, )),
+                  ((1, 0), (1, )),
+                  ((0, 1), (1, )),
+                  ((1, 1), (1, )))
+
+        n = NeuralNetwork(2, 2, 1)
+        before = n.train(examples_list, or_pat, 1, 0.5, None, 2)[0]
+        after = n.train(examples_list, or_pat, 500, 0.5, None, 2)[0]
+        self.assertTrue(after < before)
@@ -13,7 +13,10 @@ from math import sqrt
 from foxgame.options import FoxgameOption, task
 from foxgame.controller import Brain
 from foxgame.structures import Vector, Direction
-from libs.neuralnet.nn import NeuralNetwork, load_network
+from libs.neuralnet.nn import NeuralNetwork, cached_network, convert_network
+from libs.neuralnet.dataset import load_dataset
+from libs.neuralnet.loader import Loader
+from libs.neuralnet.checkpoint import checkpoint
 from foxgame.controllers.output import read_cvs_skip as read_cvs
 from collections import deque
 
@@ -26,6 +29,8 @@ class HareBrain(Brain):
     A controller which uses a neural network to escape from the fox.
     """
     examples = './foxgamelog/*'
+    # examples parsed from the logs are cached here (see load_dataset)
+    cache = './foxgamecache'
     _net_data = osjoin('foxgame', 'controllers', 'libs', 'synapsis_hare.db')
 
     size = (600, 400)
@@ -36,6 +41,10 @@ class HareBrain(Brain):
     error = None
     epochs = 100
     epsilon = 0.35
+    # examples for each update of the weights while training
+    batch_size = 1
+    # examples shuffled together while training, 0 not to shuffle them
+    shuffle = 10000
 
     speed_normalizer = 500
 
@@ -47,7 +56,16 @@ class HareBrain(Brain):
         """
         _net_struct = HareBrain.inputs, HareBrain.hiddens
 
-        self.network = load_network(self._net_data)
+        self.network = cached_network(self._net_data)
+
+    def new_episode(self):
+        """
+        The network is not changed while playing: just keep it.
+        """
+        pass
+
+    def end_episode(self):
+        pass
 
     @task
     def task_train():
@@ -59,87 +77,143 @@ class HareBrain(Brain):
             remove(HareBrain._net_data)
         HareBrain.train_network(_net_struct, HareBrain.examples)
 
+    @task
+    def task_convert():
+        """
+        Save the network of an older shelve database in the binary format.
+        """
+        log.info('Converting %s' % HareBrain._net_data)
+        convert_network(HareBrain._net_data)
+
     def update(self, time):
         """
         The neural network recives in input the following data:
         Hare position, Fox position, Carrot position and hare speed.
         """
-        diagonal = sqrt( HareBrain.size[0]**2 + HareBrain.size[1]**2 )
+        return self.direction(self.network.put(self.observe()))
 
-        data = ((self.game.hare.pos.x-self.nearest_fox.pos.x)/diagonal,
-                (self.game.hare.pos.y-self.nearest_fox.pos.y)/diagonal,
-                (self.game.hare.pos.x-self.game.carrot.pos.x)/diagonal,
-                (self.game.hare.pos.y-self.game.carrot.pos.y)/diagonal,
-                self.game.hare.pos.x/HareBrain.size[0],
-                self.game.hare.pos.y/HareBrain.size[1],
-                self.game.hare.speed.x/HareBrain.speed_normalizer,
-                self.game.hare.speed.y/HareBrain.speed_normalizer,
-                self.nearest_fox.speed.x/HareBrain.speed_normalizer,
-                self.nearest_fox.speed.y/HareBrain.speed_normalizer)
+    def update_batch(self, observations, time):
+        """
+        Put all the observations into the network at once:
+        the network is the same for all the hares.
+        """
+        return [self.direction(nnout)
+                for nnout in self.network.put_batch(observations)]
+
+    @staticmethod
+    def direction(nnout):
+        """
+        Return the Direction given by the outputs of the network.
+        """
+        return Direction.from_vector((value*2)-1 for value in nnout)
 
-        nnout = self.network.put(data)
-        output = Direction.from_vector((value*2)-1 for value in nnout)
-        return Direction(output)
+    def observe(self):
+        """
+        Return the inputs of the network.
+        """
+        return self.game.observation.features(HareBrain.size,
+                                              HareBrain.speed_normalizer)
 
     def tear_down(self):
         """
-        It saves the neural network weights into a file
+        Save the neural network weights into a file, in background,
+        if they changed (see checkpoint).
         """
-        self.network.save(self._net_data)
+        checkpoint(self._net_data).update(self.network)
 
     @staticmethod
-    def examples_generator(path):
+    def examples_files(path):
         """
+        Return the sorted list of example files matching path.
         """
-        file_list = glob(path)
+        file_list = sorted(glob(path))
 
         if file_list == []:
             raise IOError('Invalid path')
 
+        log.debug('Opening %d files' % len(file_list))
+        return file_list
+
+    @staticmethod
+    def examples_generator(path):
+        """
+        Yield [inputs, outputs] examples read from the files matching path.
+        """
+        for piece in HareBrain.examples_files(path):
+            for example in HareBrain.file_examples(piece):
+                yield example
+
+    @staticmethod
+    def file_examples(piece):
+        """
+        Yield [inputs, outputs] examples read from the CSV log piece.
+        """
         diagonal = sqrt(HareBrain.size[0]**2 + HareBrain.size[1]**2)
 
-        log.debug('Opening %d files' % len(file_list))
+        inputs_queue = deque()
+        for data in read_cvs(piece):
+            outputs = [(data['dir_h']+1)/2, (data['dir_v']+1)/2]
+            inputs = [(data['hare_x']-data['fox0_x'])/diagonal,
+                        (data['hare_y']-data['fox0_y'])/diagonal,
+                        0, # carrot x
+                        0, # carrot y
+                        data['hare_x']/HareBrain.size[0],
+                        data['hare_y']/HareBrain.size[1],
+                        data['hare_speed_x']/HareBrain.speed_normalizer,
+                        data['hare_speed_y']/HareBrain.speed_normalizer,
+                        data['fox0_speed_x']/HareBrain.speed_normalizer,
+                        data['fox0_speed_y']/HareBrain.speed_normalizer]
+            # no sense in delaying carrot position
+            carrot_pos = [(data['hare_x']-data['carrot_x'])/diagonal,
+                          (data['hare_y']-data['carrot_y'])/diagonal]
+            inputs_queue.append(inputs)
+            if len(inputs_queue) > HareBrain.advance:
+                # delayed inputs, current outputs
+                inputs = inputs_queue.popleft()
+                inputs[2:4] = carrot_pos
+                yield [inputs, outputs]
 
-        for piece in file_list:
-            inputs_queue = deque()
-            for data in read_cvs(piece):
-                outputs = [(data['dir_h']+1)/2, (data['dir_v']+1)/2]
-                inputs = [(data['hare_x']-data['fox0_x'])/diagonal,
-                            (data['hare_y']-data['fox0_y'])/diagonal,
-                            0, # carrot x
-                            0, # carrot y
-                            data['hare_x']/HareBrain.size[0],
-                            data['hare_y']/HareBrain.size[1],
-                            data['hare_speed_x']/HareBrain.speed_normalizer,
-                            data['hare_speed_y']/HareBrain.speed_normalizer,
-                            data['fox0_speed_x']/HareBrain.speed_normalizer,
-                            data['fox0_speed_y']/HareBrain.speed_normalizer]
-                # no sense in delaying carrot position
-                carrot_pos = [(data['hare_x']-data['carrot_x'])/diagonal,
-                              (data['hare_y']-data['carrot_y'])/diagonal]
-                inputs_queue.append(inputs)
-                if len(inputs_queue) > HareBrain.advance:
-                    # delayed inputs, current outputs
-                    inputs = inputs_queue.popleft()
-                    inputs[2:4] = carrot_pos
-                    yield [inputs, outputs]
+    @staticmethod
+    def dataset(path):
+        """
+        Return the ArrayDataset of the examples read from the files
+        matching path, parsing them only if they aren't cached.
+        """
+        return load_dataset(HareBrain.examples_files(path),
+                            HareBrain.file_examples,
+                            ('nn.HareBrain', tuple(HareBrain.size),
+                             HareBrain.speed_normalizer, HareBrain.advance),
+                            HareBrain.cache)
 
     @staticmethod
-    def train_network(net_struct, filename):
+    def train_network(net_struct, filename, network=None):
         """
-        Train the network using filename as examples.
+        Train the network using filename as examples, starting from
+        network if given, and save it. Return (error, epochs) as
+        NeuralNetwork.train.
         """
-        n = NeuralNetwork(*net_struct)
-        n.train(HareBrain.examples_generator, filename,
-                HareBrain.epochs, HareBrain.epsilon, HareBrain.error)
+        n = network if network is not None else NeuralNetwork(*net_struct)
+        examples = HareBrain.dataset(filename)
+        if HareBrain.shuffle:
+            # pieces of the dataset are read in random order, and their
+            # examples mixed together
+            examples = Loader(examples.split(max(1, HareBrain.shuffle // 10)),
+                              buffer_size=HareBrain.shuffle)
+        result = n.train(None, examples,
+                         HareBrain.epochs, HareBrain.epsilon, HareBrain.error,
+                         HareBrain.batch_size)
         n.save(HareBrain._net_data)
+        return result
 
 
 __extraopts__ = (FoxgameOption('hiddens', type='int'),
                  FoxgameOption('epochs', type='int'),
                  FoxgameOption('examples', type='string'),
+                 FoxgameOption('cache', type='string'),
                  FoxgameOption('epsilon', type='float'),
                  FoxgameOption('error', type='float'),
+                 FoxgameOption('batch_size', type='int'),
+                 FoxgameOption('shuffle', type='int'),
                  FoxgameOption('advance', type='int'))
 
 
@@ -3,15 +3,19 @@ rl.py: Reinforcement learning implementation
        of Hare brain
 """
 from __future__ import division
-from random import random, randint
-from math import hypot, exp, log as logn
+from random import Random
+from math import exp, log as logn
 from os.path import join as osjoin
 
+import numpy
+
 from foxgame.controller import Brain
 from foxgame.structures import Vector, Direction
 from foxgame.options import FoxgameOption, task
 
-from libs.neuralnet.nn import NeuralNetwork, load_network
+from libs.neuralnet.nn import (NeuralNetwork, cached_network,
+                               convert_network)
+from libs.neuralnet.checkpoint import checkpoint
 
 import logging
 log = logging.getLogger(__name__)
@@ -52,34 +56,38 @@ class HareBrain(Brain):
 
     update_rate = 10
 
+    # the network is saved in background every checkpoint_games games or
+    # checkpoint_interval seconds (0 for never), and when the process exits
+    checkpoint_games = 10
+    checkpoint_interval = 60
+
     def get_state(self):
-        diagonal = hypot(HareBrain.size[0], HareBrain.size[1])
-        return ((self.game.hare.pos.x-self.nearest_fox.pos.x)/diagonal,
-                (self.game.hare.pos.y-self.nearest_fox.pos.y)/diagonal,
-                (self.game.hare.pos.x-self.game.carrot.pos.x)/diagonal,
-                (self.game.hare.pos.y-self.game.carrot.pos.y)/diagonal,
-                self.game.hare.pos.x/HareBrain.size[0],
-                self.game.hare.pos.y/HareBrain.size[1],
-                self.game.hare.speed.x/HareBrain.speed_normalizer,
-                self.game.hare.speed.y/HareBrain.speed_normalizer,
-                self.nearest_fox.speed.x/HareBrain.speed_normalizer,
-                self.nearest_fox.speed.y/HareBrain.speed_normalizer)
+        return self.game.observation.features(HareBrain.size,
+                                              HareBrain.speed_normalizer)
 
     def set_up(self):
         """
         Load neural network data from a file
         """
-
-        self.state = self.get_state()
-        self.action = 0, 0
-
         try:
             # Try loading an existing policy
-            self.network = load_network(self.net_file, TDLambda)
+            self.network = cached_network(self.net_file, TDLambda)
         except IOError:
             # Should create a new network
             self.network = self.init_network()
 
+        self.new_episode()
+
+    def new_episode(self):
+        """
+        Start learning on a new game, keeping the network loaded.
+        """
+        # exploration is reproducible when the game is seeded
+        self.random = Random(self.game.seed)
+
+        self.state = self.get_state()
+        self.action = 0, 0
+
         self.update_actions(self.state)
 
         self.tick_count = 0
@@ -101,11 +109,11 @@ class HareBrain(Brain):
 
     def choose_action(self):
         # eps-greedy policy
-        if random() < self.greediness:
+        if self.random.random() < self.greediness:
             # go greedy
             return self.best_action()
         else:
-            return randint(-1, 1), randint(-1, 1)
+            return self.random.randint(-1, 1), self.random.randint(-1, 1)
 
     def update(self, time):
         self.tick_count += 1
@@ -162,17 +170,29 @@ class HareBrain(Brain):
 
         self.reward = 0
 
-    def tear_down(self):
+    def end_episode(self):
         # hackish: update with last frame
         # needed to get negative reward on game end
         self.update(1/60)
 
-        self.network.save(self.net_file)
+        checkpoint(self.net_file, self.checkpoint_games,
+                   self.checkpoint_interval).update(self.network)
+
+    def tear_down(self):
+        self.end_episode()
 
     @task
     def task_reset():
         HareBrain.init_network()
 
+    @task
+    def task_convert():
+        """
+        Save the network of an older shelve database in the binary format.
+        """
+        log.info('Converting %s' % HareBrain.net_file)
+        convert_network(HareBrain.net_file)
+
     @staticmethod
     def init_network():
         log.info('Initializing new neural network')
@@ -191,8 +211,8 @@ class TDLambda(NeuralNetwork):
         super(TDLambda, self).__init__(ni, nh, 1, False, funct, wi, wo)
 
         # Eligibility trace (e vector)
-        self.trace_wi = [[0]*self.nh for i in range(self.ni)]
-        self.trace_wo = [0]*self.nh
+        self.trace_wi = numpy.zeros((self.ni, self.nh))
+        self.trace_wo = numpy.zeros(self.nh)
 
     def update(self, inputs0, inputs1, reward, time,
                  gamma=0.1, trace_decay=0.99, alpha=0.01):
@@ -202,38 +222,28 @@ class TDLambda(NeuralNetwork):
         self.trace_bp(reward + gamma*Q_new, trace_decay=trace_decay,
                       gamma=gamma, eps=0.1)
 
+        self.own_weights()
         # update weights between input and hidden layer
-        for i in range(self.ni):
-            for j in range(self.nh):
-                self.wi[i][j] += alpha*self.trace_wi[i][j]
+        self.wi += alpha*self.trace_wi
 
-        # update weights between input and hidden layer
-        for j in range(self.nh):
-            self.wo[j][0] += alpha*self.trace_wo[j]
+        # update weights between hidden and output layer
+        self.wo[:, 0] += alpha*self.trace_wo
 
     def trace_bp(self, target, trace_decay=0.1, gamma=0.1, eps=0.5):
 
-        output_deltas = [(target-ao) * self.dfunct(ao)
-                         for k, ao in enumerate(self.ao)]
+        output_deltas = (target-self.ao) * self.dfunct(self.ao)
 
         # Hidden delta
-        hidden_deltas = []
-        for j in xrange(self.nh):
-            hidden_deltas.append(
-                            self.dfunct(self.ah[j]) * sum(
-                            od*w for od, w in zip(output_deltas, self.wo[j])))
+        hidden_deltas = self.dfunct(self.ah) * numpy.dot(self.wo,
+                                                         output_deltas)
 
         step = gamma*trace_decay
         # Weights between hidden and output
-        for j in range(self.nh):
-            self.trace_wo[j] = step*self.trace_wo[j] + \
-                                    eps * output_deltas[0] * self.ah[j]
+        self.trace_wo = step*self.trace_wo + eps * output_deltas[0] * self.ah
 
         # Weights between input and hidden
-        for i in xrange(self.ni):
-            for j in xrange(self.nh):
-                self.trace_wi[i][j] = step*self.trace_wi[i][j]  + \
-                                         eps * hidden_deltas[j] * self.ai[i]
+        self.trace_wi = step*self.trace_wi + \
+                        eps * numpy.outer(self.ai, hidden_deltas)
 
 
 __extraopts__ = (
@@ -245,6 +255,8 @@ __extraopts__ = (
                  FoxgameOption('fox_reward', type='float'),
                  FoxgameOption('carrot_reward', type='float'),
                  FoxgameOption('update_rate', type='int'),
+                 FoxgameOption('checkpoint_games', type='int'),
+                 FoxgameOption('checkpoint_interval', type='float'),
                  FoxgameOption('net_file', type='string')
                 )
 
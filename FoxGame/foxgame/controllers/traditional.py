@@ -38,12 +38,14 @@ class HareBrain(Brain):
         position of the Fox.
         """
 
+        observation = self.game.observation
+
         # choose between life and food :)
-        if all(self.pawn.distance(fox) > self.threshold for
-               fox in self.game.foxes):
+        if observation.nearest_distance > self.threshold:
             dir = self.navigate(self.game.carrot.pos)
         else:
-            target = self.nearest_fox.pos + self.nearest_fox.speed/2
+            fox = observation.nearest_fox
+            target = fox.pos + fox.speed/2
             dir = -self.navigate(target)
 
         # correct diretion for walls
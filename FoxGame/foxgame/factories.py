@@ -2,6 +2,8 @@
 factories.py: factory classes used to store and configure controllers.
 """
 
+from random import Random
+
 from foxgame.gamecore import Game, FoxGameError
 from foxgame.controller import Controller
 
@@ -12,22 +14,46 @@ class GameFactory(object):
     configured.
     """
 
-    def __init__(self, size, hare_factory, fox_factory, foxnum=1):
+    def __init__(self, size, hare_factory, fox_factory, foxnum=1, seed=None):
         """
         A GameFactory is a container which let the user configure
         dinamically, the current played game, and store a collection
         of games instances.
+
+        seed initializes the sequence of seeds given to each new game:
+        factories with the same seed build the same sequence of games.
+        If seed is None, a random one is chosen (and kept in self.seed,
+        so that the sequence can be played again).
         """
         self.harefact = hare_factory
         self.foxfact = fox_factory
         self.size = size
         self.foxnum = foxnum
 
-    def new_game(self):
+        if seed is None:
+            seed = Random().randrange(2**32)
+        self.seed = seed
+        self.seeds = Random(seed)
+
+        # descriptive informations (e.g. brains names and options)
+        # saved along with benchmark results
+        self.info = {'size': size, 'foxnum': foxnum, 'seed': seed}
+
+    def next_seed(self):
+        """
+        Return the seed for the next game.
+        """
+        return self.seeds.randrange(2**32)
+
+    def new_game(self, seed=None):
         """
         Return a new Game instance according to the configuration given.
+        If seed is None, the next seed of the factory is used.
         """
-        game = Game(self.size, self.harefact, self.foxfact, self.foxnum)
+        if seed is None:
+            seed = self.next_seed()
+        game = Game(self.size, self.harefact, self.foxfact, self.foxnum,
+                    seed)
         if hasattr(self, 'brainz_get'):
             game.brainz_draw = self.brainz_get
         return game
@@ -3,8 +3,12 @@ gamecore.py: basic classes for pawns and game logic (GL).
 """
 from __future__ import division
 
-from random import randrange
+from random import Random
+from math import sqrt, hypot
 from foxgame.structures import Vector
+from foxgame.spatial import SpatialGrid
+from foxgame.controller import decide
+from foxgame import instrument
 
 import logging
 log = logging.getLogger('CORE')
@@ -26,6 +30,41 @@ class FoxGameError(Exception):
         log.critical(serror)
         return serror
 
+
+def time_of_impact(start1, end1, start2, end2, radius):
+    """
+    Two circles move linearly from start to end positions during a step:
+    return the fraction of the step in [0, 1] at which their centers
+    are radius distant for the first time, None if that never happens.
+    """
+    # relative position at the start of the step...
+    sx, sy = start1
+    ox, oy = start2
+    dx, dy = sx - ox, sy - oy
+    # ... and relative displacement during the step
+    ex, ey = end1
+    fx, fy = end2
+    vx, vy = (ex - fx) - dx, (ey - fy) - dy
+
+    c = dx*dx + dy*dy - radius*radius
+    if c <= 0:
+        # already touching
+        return 0.0
+
+    a = vx*vx + vy*vy
+    b = dx*vx + dy*vy
+    if a == 0 or b >= 0:
+        # not getting closer
+        return None
+
+    disc = b*b - a*c
+    if disc < 0:
+        return None
+
+    toi = (-b - sqrt(disc)) / a
+    return toi if toi <= 1 else None
+
+
 # ---------- Game Logic components --------------------------------------------
 
 
@@ -37,6 +76,13 @@ class GameObject(object):
     radius = None
     color = None
 
+    # the SpatialGrid containing the object, if any, and its cell
+    index = None
+    cell = None
+
+    # position at the start of the last tick, if the object moved
+    last_pos = None
+
     def __init__(self, parent, pos=Vector(0, 0)):
         """
         Arguments:
@@ -46,6 +92,22 @@ class GameObject(object):
         self.parent = parent
         self.pos = pos
 
+    def _get_pos(self):
+        return self._pos
+
+    def _set_pos(self, pos):
+        """
+        Set the position, keeping the spatial index updated.
+        """
+        self._pos = pos
+        if self.index is not None:
+            self.index.move(self)
+        if self.parent is not None:
+            # the game's observation is out of date
+            self.parent._observation = None
+
+    pos = property(_get_pos, _set_pos)
+
     def __eq__(self, other):
         """
         Return True if other and self are *the same pawn*,
@@ -171,6 +233,7 @@ class MovingPawn(GameObject):
                                NOTE: this function may change pawn's speed
         """
         # update game physic
+        self.last_pos = self.pos
         self._update_acc(direction)
         self._update_speed(time_delta)
         self._update_pos(time_delta)
@@ -210,17 +273,121 @@ class Carrot(GameObject):
     color = 'darkorange'
 
 
+class Observation(object):
+    """
+    What brains and postfilters see of a game in a given moment.
+    Each value is computed the first time it is read, and shared by
+    every reader until pawns move (see Game.observation).
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.hare = game.hare
+        self.foxes = game.foxes
+
+        self._nearest_fox = None
+        self._distances = None
+        self._offsets = None
+        # (size, speed normalizer) -> normalized features
+        self._features = {}
+
+    @property
+    def nearest_fox(self):
+        """
+        The fox nearest to the hare.
+        """
+        if self._nearest_fox is None:
+            self._nearest_fox = self.game.nearest_fox()
+        return self._nearest_fox
+
+    @property
+    def nearest_distance(self):
+        """
+        The distance between the hare and the nearest fox
+        (see GameObject.distance).
+        """
+        return self.hare.distance(self.nearest_fox)
+
+    @property
+    def distances(self):
+        """
+        The distances between the hare and each fox.
+        """
+        if self._distances is None:
+            hare = self.hare
+            self._distances = tuple(hare.distance(fox) for fox in self.foxes)
+        return self._distances
+
+    @property
+    def offsets(self):
+        """
+        The position of the hare relative to each fox.
+        """
+        if self._offsets is None:
+            pos = self.hare.pos
+            self._offsets = tuple(pos - fox.pos for fox in self.foxes)
+        return self._offsets
+
+    def features(self, size, speed_normalizer):
+        """
+        Return the state of the game, as seen by the hare, normalized for
+        an arena of the given size and speeds up to speed_normalizer:
+         position of the hare relative to the nearest fox and to the carrot,
+         position of the hare, speed of the hare, speed of the nearest fox.
+        """
+        key = size, speed_normalizer
+        try:
+            return self._features[key]
+        except KeyError:
+            pass
+
+        width, height = size
+        diagonal = hypot(width, height)
+        hx, hy = self.hare.pos
+        fox = self.nearest_fox
+        carrot = self.game.carrot.pos
+
+        features = self._features[key] = (
+            (hx - fox.pos.x) / diagonal,
+            (hy - fox.pos.y) / diagonal,
+            (hx - carrot.x) / diagonal,
+            (hy - carrot.y) / diagonal,
+            hx / width,
+            hy / height,
+            self.hare.speed.x / speed_normalizer,
+            self.hare.speed.y / speed_normalizer,
+            fox.speed.x / speed_normalizer,
+            fox.speed.y / speed_normalizer)
+        return features
+
+
 class Game(object):
     """
     A basic, abstract game interface.
     """
 
-    def __init__(self, size, hcfact, fcfact, foxnum=1):
+    # side of the cells of the spatial index of foxes
+    cellsize = 64
+
+    # the current Observation, None when pawns moved since it was built
+    _observation = None
+
+    # if True, collisions happening during a tick are detected
+    # even if pawns don't overlap at its end
+    swept = True
+
+    def __init__(self, size, hcfact, fcfact, foxnum=1, seed=None):
         """
         Set up the basics of GameLogic.
+        Each game has its own random generator: games built with the same
+        seed are placed the same way, so they can be replayed exactly.
         """
         self.size = Vector(*size)
 
+        # random generator
+        self.seed = seed
+        self.random = Random(seed)
+
         # create pawns
         self.foxes = tuple(Fox(self) for x in xrange(foxnum))
         self.hare = Hare(self)
@@ -229,6 +396,9 @@ class Game(object):
         for pawn in self.pawns:
             pawn.game = self
 
+        # spatial index of foxes, filled by _randomlocate
+        self.grid = SpatialGrid(self.size, self.cellsize)
+
         # place objects
         self.place_carrot()
         self._randomlocate(abs(self.size) / 4)
@@ -243,6 +413,9 @@ class Game(object):
 
         self.ended = False
 
+        # latency recorder, see foxgame.instrument
+        self.recorder = instrument.recorder
+
     def _collision(self, pawn1, pawn2):
         """
         Find if there's a collision between obj1 and obj2:
@@ -256,15 +429,57 @@ class Game(object):
         Return True if there's any collision between any fox and the hare,
         False otherwise.
         """
-        return any(self._collision(self.hare, fox) for fox in self.foxes)
+        hare = self.hare
+        return any(self._collision(hare, fox) for fox in
+                   self.grid.near(hare.pos, hare.radius + Fox.radius))
+
+    def _swept_collision(self, pawn1, pawn2):
+        """
+        Find if pawn1 and pawn2 collided while moving in the last tick.
+        """
+        start1 = pawn1.pos if pawn1.last_pos is None else pawn1.last_pos
+        start2 = pawn2.pos if pawn2.last_pos is None else pawn2.last_pos
+        return time_of_impact(start1, pawn1.pos, start2, pawn2.pos,
+                              pawn1.radius + pawn2.radius) is not None
+
+    def swept_collision(self, time):
+        """
+        Return True if any fox collided with the hare while moving
+        during the last tick of the given time, False otherwise.
+        """
+        hare = self.hare
+        start = hare.pos if hare.last_pos is None else hare.last_pos
+        # a fox may be at most this distant from the hare at the end of tick
+        reach = (hare.radius + Fox.radius + Fox.bspeed * time +
+                 hare.pos.distance(start))
+        return any(self._swept_collision(hare, fox) for fox in
+                   self.grid.near(hare.pos, reach))
+
+    def nearest_fox(self, pos=None):
+        """
+        Return the fox nearest to pos, by default the hare position.
+        """
+        return self.grid.nearest(self.hare.pos if pos is None else pos)
+
+    @property
+    def observation(self):
+        """
+        Return the Observation of the current state of the game: it is
+        built once and shared by all brains and postfilters deciding
+        in the same tick.
+        """
+        if self._observation is None:
+            self._observation = Observation(self)
+        return self._observation
 
     def _randompoint(self, wall_dist=0):
         """
         Return a random point in the arena at least wall_dist distant
         from each wall.
         """
+        randrange = self.random.randrange
         return Vector(randrange(wall_dist, self.size.x - wall_dist),
-                       randrange(wall_dist, self.size.y - wall_dist))
+                      randrange(wall_dist, self.size.y - wall_dist))
 
     def _randomlocate(self, mindist):
         """
@@ -273,6 +488,9 @@ class Game(object):
         """
         self.hare.pos = self._randompoint(self.hare.radius)
 
+        # foxes are indexed as soon as they are placed
+        self.grid.clear()
+
         # Choose (a bit arbitrarily) a maximum number of
         # retries for fox collision avoiding.
         max_retries = 2 * len(self.foxes)
@@ -283,20 +501,25 @@ class Game(object):
         # Fox-to-hare minimum distance
         hare_dist = mindist
 
-        for i, fox in enumerate(self.foxes):
+        def crowded(fox):
+            """
+            Return True if fox is too near to the foxes already placed.
+            """
+            reach = fox_dist + fox.radius + Fox.radius
+            return any(fox.distance(other) < fox_dist
+                       for other in self.grid.near(fox.pos, reach))
+
+        for fox in self.foxes:
             fox.pos = self._randompoint(fox.radius)
             must_retry = self.hare.distance(fox) < hare_dist
-            may_retry = (must_retry or
-                         any(fox.distance(other) < fox_dist
-                             for other in self.foxes[:i]))
+            may_retry = must_retry or crowded(fox)
             while must_retry or (retries_left > 0 and may_retry):
                 if not must_retry and may_retry:
                     retries_left -= 1
                 fox.pos = self._randompoint(fox.radius)
                 must_retry = self.hare.distance(fox) < hare_dist
-                may_retry = (must_retry or
-                             any(fox.distance(other) < fox_dist
-                                 for other in self.foxes[:i]))
+                may_retry = must_retry or crowded(fox)
+            self.grid.insert(fox)
 
         # log.debug('Random location of foxes, %d retries',
         #           max_retries - retries_left)
@@ -325,25 +548,122 @@ class Game(object):
         """
         self.carrot.pos = self._randompoint(wall_dist=10)
 
+    def reset(self, seed=None):
+        """
+        Start a new game reusing pawns, controllers and their brains:
+        controllers are notified the game is ending, then the random
+        generator is seeded again, counters are cleared, objects are
+        placed again and finally controllers are notified the new game
+        is starting (see Brain.end_episode and Brain.new_episode).
+
+        A reset game is placed as a new Game built with the same seed.
+        """
+        for pawn in self.pawns:
+            pawn.controller.end_episode()
+
+        self.seed = seed
+        self.random.seed(seed)
+
+        for pawn in self.pawns:
+            pawn.speed = pawn.acc = Vector(0, 0)
+            pawn.last_pos = None
+        self.hare.carrots = 0
+        self.time_elapsed = 0
+        self.ended = False
+
+        # place objects
+        self.place_carrot()
+        self._randomlocate(abs(self.size) / 4)
+        self._observation = None
+
+        for pawn in self.pawns:
+            pawn.controller.new_episode()
+
+    def snapshot(self):
+        """
+        Return the state of the game as a tuple of immutable objects:
+         (pawns, carrot position, carrots eaten, time elapsed, random state)
+        where pawns holds a (pos, speed, acc) tuple for each pawn,
+        in the same order of self.pawns.
+
+        Brains and postfilters are not part of the snapshot.
+        """
+        return (tuple((pawn.pos, pawn.speed, pawn.acc)
+                      for pawn in self.pawns),
+                self.carrot.pos,
+                self.hare.carrots,
+                self.time_elapsed,
+                self.random.getstate())
+
+    def restore(self, snapshot):
+        """
+        Bring the game back to the state returned by self.snapshot().
+        """
+        pawns, carrot, carrots, time_elapsed, random_state = snapshot
+
+        for pawn, (pos, speed, acc) in zip(self.pawns, pawns):
+            pawn.pos = pos
+            pawn.speed = speed
+            pawn.acc = acc
+            pawn.last_pos = None
+        self.carrot.pos = carrot
+        self.hare.carrots = carrots
+        self.time_elapsed = time_elapsed
+        self.random.setstate(random_state)
+        self._observation = None
+
     def tick(self, time):
         """
         Updates the game according to the time given.
         """
         # updates total time
         self.time_elapsed += time
+        self._observation = None
+
+        return self.advance(time, decide([pawn.controller
+                                          for pawn in self.pawns], time))
+
+    def advance(self, time, moves):
+        """
+        Move pawns in the directions given, then check for collisions
+        as tick does. With a recorder, latencies of moves and collision
+        checks are recorded.
+        """
+        recorder = self.recorder
 
         # moves pawns
-        for pawn, move in [(p, p.controller.update(time)) for p in self.pawns]:
-            pawn.drive(move, time)
+        for pawn, move in zip(self.pawns, moves):
+            if recorder is None:
+                pawn.drive(move, time)
+            else:
+                recorder.timed('drive:' + pawn.__class__.__name__,
+                               pawn.drive, move, time)
 
         # check for collisions
-        if self.collision:
+        if recorder is None:
+            caught = self._check_collision(time)
+        else:
+            caught = recorder.timed('collision', self._check_collision, time)
+        if caught:
             return False
-        elif self._collision(self.hare, self.carrot):
+
+        if recorder is None:
+            eaten = self._check_carrot(time)
+        else:
+            eaten = recorder.timed('collision:carrot', self._check_carrot,
+                                   time)
+        if eaten:
             self.hare.carrots += 1
             self.place_carrot()
             return True
 
+    def _check_collision(self, time):
+        return self.collision or (self.swept and self.swept_collision(time))
+
+    def _check_carrot(self, time):
+        return (self._collision(self.hare, self.carrot) or
+                (self.swept and self._swept_collision(self.hare, self.carrot)))
+
     def end(self):
         """
         Cleans up objects owned by the game.
@@ -354,3 +674,24 @@ class Game(object):
             self.ended = True
             for pawn in self.pawns:
                 pawn.controller.destroy()
+
+
+def tick_games(games, time):
+    """
+    Tick many games at once, as Game.tick does: brains of the same class
+    implementing update_batch decide together for all the games.
+    Return the list of the results of each game.
+    """
+    controllers = []
+    sizes = []
+    for game in games:
+        game.time_elapsed += time
+        game._observation = None
+        sizes.append(len(controllers))
+        controllers.extend(pawn.controller for pawn in game.pawns)
+    sizes.append(len(controllers))
+
+    moves = decide(controllers, time)
+
+    return [game.advance(time, moves[start:end])
+            for game, start, end in zip(games, sizes, sizes[1:])]
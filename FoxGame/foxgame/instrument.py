@@ -0,0 +1,133 @@
+"""
+instrument.py: optional latency measurements of game components (INSTR).
+
+When enabled, controllers time each brain and postfilter update, and games
+time pawns moves and collision checks. Latencies are collected by the
+process-wide Recorder, whose report is dumped once, when the process
+exits (see dump_at_exit).
+
+When disabled (the default), games and controllers only check that
+the recorder is None.
+"""
+from __future__ import division
+from os import getpid
+from timeit import default_timer as timer
+from multiprocessing.util import Finalize
+
+from foxgame.stats import RunningStats
+
+import logging
+log = logging.getLogger('INSTR')
+
+# the Recorder of the current process, if enabled
+recorder = None
+
+
+def enable(dest=None):
+    """
+    Start recording latencies, dumping reports to the file dest
+    (to the log if dest is None). Return the new Recorder.
+    """
+    global recorder
+    recorder = Recorder(dest)
+    return recorder
+
+
+def disable():
+    """
+    Stop recording latencies.
+    """
+    global recorder
+    recorder = None
+
+
+def dump_at_exit():
+    """
+    Dump the report of the recorder, if enabled, when the current process
+    exits. Pool workers leave with os._exit, skipping atexit: they must
+    call it too, once started (multiprocessing runs finalizers there).
+    """
+    if recorder is not None:
+        Finalize(None, recorder.dump, exitpriority=0)
+
+
+def component_name(kind, obj):
+    """
+    Return the name used to record the latencies of the object obj.
+    """
+    return '%s:%s.%s' % (kind, obj.__class__.__module__.split('.')[-1],
+                         obj.__class__.__name__)
+
+
+class Recorder(object):
+    """
+    Collects latencies (in seconds) of each component
+    into a RunningStats.
+    """
+
+    def __init__(self, dest=None):
+        self.dest = dest
+        # process which created the recorder: others dump to other files
+        self.pid = getpid()
+
+        # component name -> RunningStats of its latencies
+        self.latencies = {}
+
+    def record(self, name, latency):
+        """
+        Add the latency of a single call to the component name.
+        """
+        try:
+            self.latencies[name].add(latency)
+        except KeyError:
+            self.latencies[name] = stats = RunningStats()
+            stats.add(latency)
+
+    def timed(self, name, func, *args):
+        """
+        Call func(*args) recording its latency, and return its result.
+        """
+        start = timer()
+        result = func(*args)
+        self.record(name, timer() - start)
+        return result
+
+    def merge(self, other):
+        """
+        Add latencies recorded by another Recorder.
+        """
+        for name, stats in other.latencies.iteritems():
+            self.latencies.setdefault(name, RunningStats()).merge(stats)
+
+    def report(self):
+        """
+        Return a table with statistics of each component,
+        slowest components (by total time) first.
+        """
+        lines = ['%-32s %9s %9s %9s %9s %9s %10s' % (
+                 'component', 'calls', 'mean(us)', 'p50(us)', 'p95(us)',
+                 'max(us)', 'total(ms)')]
+
+        for name, stats in sorted(self.latencies.iteritems(),
+                                  key=lambda item: -item[1].total):
+            lines.append('%-32s %9d %9.1f %9.1f %9.1f %9.1f %10.1f' % (
+                         name, stats.count, stats.mean * 1e6,
+                         stats.quantile(.5) * 1e6, stats.quantile(.95) * 1e6,
+                         stats.max * 1e6, stats.total * 1e3))
+        return '\n'.join(lines)
+
+    def dump(self):
+        """
+        Write the report to self.dest.
+        """
+        if self.dest is None:
+            log.info('latency report:\n' + self.report())
+            return
+
+        dest = self.dest
+        if getpid() != self.pid:
+            # a worker process (see UI.simulator): don't overwrite the report
+            dest = '%s.%d' % (dest, getpid())
+        with open(dest, 'w') as out:
+            print >> out, self.report()
+        log.debug('latency report written to %s' % dest)
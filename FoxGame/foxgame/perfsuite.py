@@ -0,0 +1,313 @@
+"""
+perfsuite.py: throughput benchmarks of the game engine and controllers.
+
+Each case measures how many operations (usually ticks) per second are run,
+and how many Vector instances are built and Direction instances looked up
+for each operation. Results can be appended to a history file (a JSON
+record per line) and compared with the previous run.
+"""
+from __future__ import division
+from tempfile import mkdtemp
+from shutil import rmtree
+from timeit import default_timer as timer
+from os.path import join as osjoin
+from os import devnull
+import json
+import platform
+import time
+
+from foxgame import structures
+from foxgame.structures import Vector, Direction
+from foxgame.factories import ControllerFactory, load_brain, load_postfilters
+from foxgame.gamecore import Game
+
+import logging
+log = logging.getLogger('PERF')
+
+SIZE = (600, 400)
+TIMESTEP = 1/32
+
+
+class AllocationCounter(object):
+    """
+    While active (as a context manager), count the Vector instances built
+    and the Direction instances requested.
+    """
+
+    def __init__(self):
+        self.vectors = self.directions = 0
+
+    def __enter__(self):
+        self._new = structures._new
+        self.vector_new = Vector.__new__
+        self.direction_new = Direction.__new__
+
+        def new(cls, items):
+            if cls is Vector:
+                self.vectors += 1
+            return self._new(cls, items)
+
+        def vector_new(cls, x, y):
+            self.vectors += 1
+            return self.vector_new(cls, x, y)
+
+        def direction_new(cls, dir):
+            self.directions += 1
+            return self.direction_new(cls, dir)
+
+        structures._new = new
+        Vector.__new__ = staticmethod(vector_new)
+        Direction.__new__ = staticmethod(direction_new)
+        return self
+
+    def __exit__(self, *exc_info):
+        structures._new = self._new
+        Vector.__new__ = staticmethod(self.vector_new)
+        Direction.__new__ = staticmethod(self.direction_new)
+
+
+###########
+## CASES ##
+###########
+
+class Case(object):
+    """
+    A benchmark: set_up() prepares it, step() runs a single operation
+    and tear_down() cleans up.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def set_up(self):
+        pass
+
+    def step(self):
+        raise NotImplementedError('step method not overwritten.')
+
+    def tear_down(self):
+        pass
+
+
+class VectorCase(Case):
+    """
+    Vector arithmetic, as used by the physics.
+    """
+
+    def set_up(self):
+        self.a = Vector(3.0, 4.0)
+        self.b = Vector(-1.5, 2.5)
+
+    def step(self):
+        a, b = self.a, self.b
+        c = (a + b) * 0.5 - b / 2
+        abs(c)
+        c.normalize()
+        a.distance(b)
+
+
+class DriveCase(Case):
+    """
+    MovingPawn.drive of a hare turning around.
+    """
+
+    directions = [Direction(d) for d in ((1, 0), (1, 1), (0, 1), (-1, 1),
+                                         (-1, 0), (-1, -1), (0, -1), (1, -1))]
+
+    def set_up(self):
+        void = ControllerFactory(load_brain('void', 'HareBrain'))
+        self.game = Game(SIZE, void, ControllerFactory(
+                                         load_brain('void', 'FoxBrain')),
+                         seed=0)
+        self.count = 0
+
+    def step(self):
+        self.count += 1
+        self.game.hare.drive(self.directions[(self.count // 16) % 8],
+                             TIMESTEP)
+
+    def tear_down(self):
+        self.game.end()
+
+
+class GameCase(Case):
+    """
+    Game.tick of full games, started again when the hare is caught.
+    """
+
+    def __init__(self, name, foxnum=1, hare_brain='traditional',
+                 fox_brain='traditional', hare_pfilters=()):
+        Case.__init__(self, name)
+        self.foxnum = foxnum
+        self.hare_brain = hare_brain
+        self.fox_brain = fox_brain
+        self.hare_pfilters = hare_pfilters
+
+    def set_up(self):
+        self.dir = mkdtemp()
+        self.configure()
+
+        harefact = ControllerFactory(
+                       load_brain(self.hare_brain, 'HareBrain'),
+                       load_postfilters((name, None)
+                                        for name in self.hare_pfilters))
+        foxfact = ControllerFactory(load_brain(self.fox_brain, 'FoxBrain'))
+        self.seed = 0
+        self.game = Game(SIZE, harefact, foxfact, self.foxnum, self.seed)
+
+    def configure(self):
+        """
+        Point brains and postfilters writing files to self.dir.
+        """
+        self.saved = []
+
+        def setattr_saved(klass, name, value):
+            self.saved.append((klass, name, getattr(klass, name)))
+            setattr(klass, name, value)
+
+        if self.hare_brain == 'nn':
+            from foxgame.controllers import nn
+            from foxgame.controllers.libs.neuralnet.nn import NeuralNetwork
+            path = osjoin(self.dir, 'synapsis_hare.db')
+            NeuralNetwork(nn.HareBrain.inputs, nn.HareBrain.hiddens).save(path)
+            setattr_saved(nn.HareBrain, '_net_data', path)
+        elif self.hare_brain == 'rl':
+            from foxgame.controllers import rl
+            setattr_saved(rl.HareBrain, 'net_file',
+                          osjoin(self.dir, 'rl_Q.db'))
+
+        for name in self.hare_pfilters:
+            if name == 'output.CSV':
+                from foxgame.controllers import output
+                setattr_saved(output.CSV, 'logfile',
+                              osjoin(self.dir, 'game.csv'))
+            elif name == 'benchmark.Benchmark':
+                from foxgame.controllers import benchmark
+                setattr_saved(benchmark.Benchmark, 'dest', devnull)
+
+    def step(self):
+        if self.game.tick(TIMESTEP) == False:
+            self.seed += 1
+            self.game.reset(self.seed)
+
+    def tear_down(self):
+        self.game.end()
+        # networks are saved in background: wait for them
+        from foxgame.controllers.libs.neuralnet.checkpoint import \
+            flush_checkpoints
+        flush_checkpoints()
+        for klass, name, value in reversed(self.saved):
+            setattr(klass, name, value)
+        rmtree(self.dir)
+
+
+CASES = [VectorCase('vector'),
+         DriveCase('drive'),
+         GameCase('tick-1fox', 1),
+         GameCase('tick-10foxes', 10),
+         GameCase('tick-100foxes', 100),
+         GameCase('brain-void', hare_brain='void', fox_brain='void'),
+         GameCase('brain-traditional'),
+         GameCase('brain-fuzzy', hare_brain='fuzzy'),
+         GameCase('brain-nn', hare_brain='nn'),
+         GameCase('brain-rl', hare_brain='rl')]
+CASES.extend(GameCase('pfilter-' + name, hare_pfilters=(name,))
+             for name in ('processors.Inverted', 'processors.SlowDown',
+                          'processors.Delay', 'benchmark.Benchmark',
+                          'output.CSV'))
+
+
+def measure(case, duration=1.0, allocsteps=200):
+    """
+    Run case for about duration seconds; return a dictionary with
+    the operations per second and allocations per operation.
+    """
+    case.set_up()
+    try:
+        # warm up, and find how many steps to run between two clock reads
+        steps = 1
+        start = timer()
+        while timer() - start < duration / 20:
+            for x in xrange(steps):
+                case.step()
+            steps *= 2
+
+        done = 0
+        start = timer()
+        while True:
+            for x in xrange(steps):
+                case.step()
+            done += steps
+            elapsed = timer() - start
+            if elapsed >= duration:
+                break
+
+        # allocations are counted apart: counting slows down steps
+        with AllocationCounter() as counter:
+            for x in xrange(allocsteps):
+                case.step()
+    finally:
+        case.tear_down()
+
+    return {'case': case.name,
+            'ops': done,
+            'ops_per_sec': done / elapsed,
+            'vectors_per_op': counter.vectors / allocsteps,
+            'directions_per_op': counter.directions / allocsteps}
+
+
+def run(cases=None, duration=1.0):
+    """
+    Measure each case whose name contains one of the strings in cases
+    (all of them if cases is None), yielding results.
+    """
+    for case in CASES:
+        if cases and not any(name in case.name for name in cases):
+            continue
+        log.info('measuring %s' % case.name)
+        yield measure(case, duration)
+
+
+def load_history(path):
+    """
+    Return the list of runs saved in the history file path.
+    """
+    try:
+        with open(path) as history:
+            return [json.loads(line) for line in history if line.strip()]
+    except IOError:
+        return []
+
+
+def save_run(path, results, label=None):
+    """
+    Append a run to the history file path.
+    """
+    record = {'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+              'label': label,
+              'python': platform.python_version(),
+              'machine': platform.node(),
+              'results': results}
+    with open(path, 'a') as history:
+        print >> history, json.dumps(record, sort_keys=True)
+
+
+def format_results(results, previous=None):
+    """
+    Return a table of results, with the change since a previous run.
+    """
+    before = {}
+    if previous is not None:
+        before = dict((result['case'], result['ops_per_sec'])
+                      for result in previous['results'])
+
+    lines = ['%-32s %12s %8s %10s %10s' % ('case', 'ops/sec', 'change',
+                                          'vectors', 'directions')]
+    for result in results:
+        old = before.get(result['case'])
+        change = ('%+7.1f%%' % (100 * (result['ops_per_sec'] / old - 1))
+                  if old else '')
+        lines.append('%-32s %12.0f %8s %10.1f %10.1f' % (
+                     result['case'], result['ops_per_sec'], change,
+                     result['vectors_per_op'], result['directions_per_op']))
+    return '\n'.join(lines)
@@ -0,0 +1,196 @@
+"""
+profiling.py: run the game (or a task) under a profiler (PROF).
+
+Two profilers are available:
+ - 'deterministic': cProfile, saving a pstats file;
+ - 'sampling': a statistical profiler based on the SIGPROF timer, saving
+   collapsed stacks ("func1;func2;func3 count" lines, as used by
+   flame graph tools). It slows the game much less than cProfile.
+
+Both print the functions taking most of the time, grouped by subsystem.
+"""
+from __future__ import division
+from os.path import normpath, sep
+import cProfile
+import pstats
+import signal
+
+import logging
+log = logging.getLogger('PROF')
+
+# (path fragment, subsystem), most specific first
+SUBSYSTEMS = [('foxgame/controllers/libs/neuralnet/', 'libs.neuralnet'),
+              ('foxgame/controllers/libs/fuzzy/', 'libs.fuzzy'),
+              ('foxgame/controllers/', 'controllers'),
+              ('foxgame/UI/', 'UI'),
+              ('foxgame/', 'gamecore')]
+
+
+def subsystem(filename):
+    """
+    Return the subsystem of the file filename.
+    """
+    filename = normpath(filename).replace(sep, '/')
+    for fragment, name in SUBSYSTEMS:
+        if fragment in filename:
+            return name
+    return 'other'
+
+
+def function_name(filename, lineno, funcname):
+    """
+    Return a short name of a function.
+    """
+    if filename == '~':
+        # builtins, as named by cProfile
+        return funcname
+    return '%s:%d(%s)' % (filename.replace(sep, '/').split('foxgame/')[-1],
+                          lineno, funcname)
+
+
+def format_report(functions, total, unit, top=20, fmt='%.3f'):
+    """
+    Return the report of the time spent by functions and subsystems.
+    functions is a list of (filename, lineno, funcname, self time,
+    cumulative time) tuples, total the whole time spent; times are
+    formatted with fmt.
+    """
+    if not total:
+        return 'nothing recorded.'
+
+    # time spent by each subsystem
+    subsystems = {}
+    for filename, lineno, funcname, tself, tcum in functions:
+        name = subsystem(filename)
+        subsystems[name] = subsystems.get(name, 0) + tself
+
+    lines = ['%-16s %12s %7s' % ('subsystem', 'self' + unit, '%')]
+    for name, tself in sorted(subsystems.iteritems(),
+                              key=lambda item: -item[1]):
+        lines.append('%-16s %12s %6.1f%%' % (name, fmt % tself,
+                                              100*tself/total))
+    lines.append('')
+
+    # hottest functions
+    lines.append('%-16s %12s %12s  %s' % ('subsystem', 'self' + unit,
+                                           'cumul' + unit, 'function'))
+    functions = sorted(functions, key=lambda func: -func[3])
+    for filename, lineno, funcname, tself, tcum in functions[:top]:
+        lines.append('%-16s %12s %12s  %s' % (
+                     subsystem(filename), fmt % tself, fmt % tcum,
+                     function_name(filename, lineno, funcname)))
+
+    return '\n'.join(lines)
+
+
+def deterministic(func, dest, top=20):
+    """
+    Call func under cProfile, save statistics to dest and
+    return the report.
+    """
+    profile = cProfile.Profile()
+    try:
+        profile.runcall(func)
+    finally:
+        profile.dump_stats(dest)
+        log.info('profile statistics saved to %s' % dest)
+
+    stats = pstats.Stats(dest)
+    functions = [(filename, lineno, funcname, tt, ct)
+                 for (filename, lineno, funcname), (cc, nc, tt, ct, callers)
+                 in stats.stats.iteritems()]
+    return format_report(functions, stats.total_tt, '(s)', top)
+
+
+class Sampler(object):
+    """
+    A statistical profiler: every 'interval' seconds of CPU time
+    it records the stack of the running frame.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        # stack (tuple of (filename, lineno, funcname)) -> samples
+        self.stacks = {}
+        self.samples = 0
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno,
+                          code.co_name))
+            frame = frame.f_back
+        stack = tuple(reversed(stack))
+
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+    def start(self):
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def save(self, dest):
+        """
+        Write collapsed stacks to dest.
+        """
+        with open(dest, 'w') as out:
+            for stack, count in sorted(self.stacks.iteritems()):
+                print >> out, '%s %d' % (';'.join(function_name(*func)
+                                                  for func in stack), count)
+
+    def functions(self):
+        """
+        Return (filename, lineno, funcname, self samples, cumulative samples)
+        of each sampled function.
+        """
+        tself = {}
+        tcum = {}
+        for stack, count in self.stacks.iteritems():
+            func = stack[-1]
+            tself[func] = tself.get(func, 0) + count
+            # recursive functions are counted once per stack
+            for func in set(stack):
+                tcum[func] = tcum.get(func, 0) + count
+        return [func + (tself.get(func, 0), tcum[func]) for func in tcum]
+
+
+def sampling(func, dest, top=20, interval=0.001):
+    """
+    Call func under the sampling profiler, save collapsed stacks to dest
+    and return the report.
+    """
+    sampler = Sampler(interval)
+    sampler.start()
+    try:
+        func()
+    finally:
+        sampler.stop()
+        sampler.save(dest)
+        log.info('collapsed stacks saved to %s' % dest)
+
+    return format_report(sampler.functions(), sampler.samples,
+                         '(samples)', top, '%d')
+
+
+PROFILERS = {'deterministic': deterministic,
+             'sampling': sampling}
+
+
+def profile(func, profiler='deterministic', dest=None, top=20):
+    """
+    Call func under the profiler given, save its output to dest
+    (by default 'profile.pstats' or 'profile.collapsed')
+    and print the report.
+    """
+    if profiler not in PROFILERS:
+        raise ValueError('unknown profiler %s' % profiler)
+    if dest is None:
+        dest = ('profile.pstats' if profiler == 'deterministic'
+                else 'profile.collapsed')
+
+    print PROFILERS[profiler](func, dest, top)
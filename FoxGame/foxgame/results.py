@@ -0,0 +1,146 @@
+"""
+results.py: benchmark result records, saved as JSON or CSV and compared.
+
+A record is a dictionary like:
+  {'info':    {'hare_brain': 'nn', 'seed': 5, ...},
+   'games':   1000,
+   'walltime': 12.5,
+   'ticks_per_sec': 52000.0,
+   'metrics': {'cpm': {'count': 1000, 'mean': 21.3, 'stdev': 12.1,
+                       'ci': 0.75, 'min': 0, 'max': 60,
+                       'p5': 0, 'p25': 11, 'p50': 20, 'p75': 31, 'p95': 46},
+               ...}}
+"""
+from __future__ import division
+from math import sqrt
+import csv
+import json
+
+from foxgame.stats import normal_cdf
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# metrics describing the play quality and the simulation speed:
+# the bigger, the better
+QUALITY = ('cpm', 'carrots', 'time')
+THROUGHPUT = ('tps',)
+
+
+def summarize(stats, confidence=0.95):
+    """
+    Return a dictionary describing a RunningStats.
+    """
+    summary = {'count': stats.count,
+               'mean': stats.mean,
+               'stdev': sqrt(stats.sample_variance),
+               'ci': stats.interval(confidence),
+               'min': stats.min,
+               'max': stats.max}
+    for p in PERCENTILES:
+        summary['p%d' % p] = stats.quantile(p / 100)
+    return summary
+
+
+def make_record(info, store, walltime, confidence=0.95):
+    """
+    Return a new record with the informations 'info' and the
+    statistics (RunningStats) of 'store'.
+    """
+    metrics = dict((key, summarize(stats, confidence))
+                   for key, stats in store.iteritems())
+
+    record = {'info': info,
+              'confidence': confidence,
+              'walltime': walltime,
+              'metrics': metrics}
+    if 'ticks' in store:
+        record['games'] = store['ticks'].count
+        record['ticks'] = store['ticks'].total
+        record['ticks_per_sec'] = (store['ticks'].total / walltime
+                                   if walltime else 0)
+    return record
+
+
+def _flatten(record, prefix=''):
+    """
+    Yield (key, value) pairs of a nested dictionary,
+    joining keys with dots.
+    """
+    for key in sorted(record):
+        value = record[key]
+        if isinstance(value, dict) and value:
+            for item in _flatten(value, prefix + key + '.'):
+                yield item
+        else:
+            yield prefix + key, value
+
+
+def save(record, path):
+    """
+    Write record to path: as CSV if path ends with '.csv',
+    as JSON otherwise.
+
+    CSV files have a header row with the keys of the nested dictionaries
+    joined by dots, and a row with their values encoded as JSON.
+    """
+    with open(path, 'wb' if path.endswith('.csv') else 'w') as dest:
+        if path.endswith('.csv'):
+            keys, values = zip(*_flatten(record))
+            writer = csv.writer(dest)
+            writer.writerow(keys)
+            writer.writerow(map(json.dumps, values))
+        else:
+            json.dump(record, dest, indent=2, sort_keys=True)
+
+
+def load(path):
+    """
+    Read a record previously saved to path.
+    """
+    with open(path, 'rb' if path.endswith('.csv') else 'r') as src:
+        if not path.endswith('.csv'):
+            return json.load(src)
+
+        keys, values = csv.reader(src)
+        record = {}
+        for key, value in zip(keys, values):
+            parent = record
+            key = key.split('.')
+            for name in key[:-1]:
+                parent = parent.setdefault(name, {})
+            parent[key[-1]] = json.loads(value)
+        return record
+
+
+def welch(old, new):
+    """
+    Compare the means of two metric summaries with Welch's test;
+    return the difference of the means and its two-sided p-value.
+    """
+    diff = new['mean'] - old['mean']
+    error = sqrt(old['stdev']**2 / old['count'] +
+                 new['stdev']**2 / new['count'])
+    if not error:
+        return diff, 1.0 if not diff else 0.0
+    return diff, 2 * (1 - normal_cdf(abs(diff) / error))
+
+
+def compare(old, new, alpha=0.05):
+    """
+    Compare the metrics of two records.
+    Return a list of (metric, old mean, new mean, difference, p-value,
+    status) where status is 'regression', 'improvement' or ''.
+    """
+    rows = []
+    for key in QUALITY + THROUGHPUT:
+        if key not in old['metrics'] or key not in new['metrics']:
+            continue
+        before, after = old['metrics'][key], new['metrics'][key]
+        diff, pvalue = welch(before, after)
+
+        status = ''
+        if pvalue < alpha:
+            status = 'improvement' if diff > 0 else 'regression'
+        rows.append((key, before['mean'], after['mean'], diff, pvalue,
+                     status))
+    return rows
@@ -0,0 +1,154 @@
+"""
+spatial.py: a uniform grid used to find GameObjects near a point.
+"""
+from __future__ import division
+from math import hypot
+
+
+class SpatialGrid(object):
+    """
+    A uniform grid of square cells covering the arena.
+
+    Each object is stored into the cell containing its position.
+    Objects inserted in the grid keep it updated when their position
+    changes (see GameObject.pos), so queries cost as much as the number
+    of objects in the neighbourhood and not as the total number of objects.
+    """
+
+    def __init__(self, size, cellsize):
+        """
+        Set up an empty grid covering an arena of the given size.
+        """
+        self.cellsize = cellsize
+        self.cols = int(size[0] // cellsize) + 1
+        self.rows = int(size[1] // cellsize) + 1
+
+        # cell coordinates -> list of objects
+        self.cells = {}
+        # object -> insertion order, used to break ties in nearest()
+        self.order = {}
+        self.count = 0
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, obj):
+        return obj in self.order
+
+    def __iter__(self):
+        """
+        Yield objects in insertion order.
+        """
+        return iter(sorted(self.order, key=self.order.get))
+
+    def _cell(self, pos):
+        """
+        Return the coordinates of the cell containing pos.
+        """
+        x, y = pos
+        return (min(max(int(x // self.cellsize), 0), self.cols - 1),
+                min(max(int(y // self.cellsize), 0), self.rows - 1))
+
+    def insert(self, obj):
+        """
+        Add obj to the grid.
+        """
+        obj.cell = self._cell(obj.pos)
+        self.cells.setdefault(obj.cell, []).append(obj)
+
+        self.order[obj] = self.count
+        self.count += 1
+
+        obj.index = self
+
+    def remove(self, obj):
+        """
+        Remove obj from the grid.
+        """
+        self.cells[obj.cell].remove(obj)
+        del self.order[obj]
+
+        obj.index = obj.cell = None
+
+    def move(self, obj):
+        """
+        Update the cell of obj after its position changed.
+        """
+        cell = self._cell(obj.pos)
+        if cell != obj.cell:
+            self.cells[obj.cell].remove(obj)
+            self.cells.setdefault(cell, []).append(obj)
+            obj.cell = cell
+
+    def clear(self):
+        """
+        Remove all the objects from the grid.
+        """
+        for obj in self.order:
+            obj.index = obj.cell = None
+
+        self.cells.clear()
+        self.order.clear()
+
+    def near(self, pos, radius):
+        """
+        Yield the objects which may be at most radius distant from pos:
+        all of them are, plus some others lying in the same cells.
+        """
+        x, y = pos
+        cellsize = self.cellsize
+        imin = max(int((x - radius) // cellsize), 0)
+        imax = min(int((x + radius) // cellsize), self.cols - 1)
+        jmin = max(int((y - radius) // cellsize), 0)
+        jmax = min(int((y + radius) // cellsize), self.rows - 1)
+
+        cells = self.cells
+        for i in xrange(imin, imax + 1):
+            for j in xrange(jmin, jmax + 1):
+                cell = cells.get((i, j))
+                if cell:
+                    for obj in cell:
+                        yield obj
+
+    def _ring(self, ci, cj, ring):
+        """
+        Yield the coordinates of cells at distance ring
+        from the cell (ci, cj), using the chessboard metric.
+        """
+        if ring == 0:
+            yield ci, cj
+            return
+
+        for i in xrange(ci - ring, ci + ring + 1):
+            yield i, cj - ring
+            yield i, cj + ring
+        for j in xrange(cj - ring + 1, cj + ring):
+            yield ci - ring, j
+            yield ci + ring, j
+
+    def nearest(self, pos):
+        """
+        Return the object whose center is nearest to pos, or None if the
+        grid is empty. Ties are broken by insertion order, just like
+        min() on the sequence of inserted objects.
+        """
+        x, y = pos
+        ci, cj = self._cell(pos)
+        cells = self.cells
+        order = self.order
+
+        best = None
+        bestkey = None
+        for ring in xrange(max(self.cols, self.rows)):
+            for cell in self._ring(ci, cj, ring):
+                for obj in cells.get(cell, ()):
+                    ox, oy = obj.pos
+                    key = hypot(ox - x, oy - y), order[obj]
+                    if bestkey is None or key < bestkey:
+                        best, bestkey = obj, key
+
+            # objects not yet seen are at least ring*cellsize distant
+            if best is not None and bestkey[0] < ring * self.cellsize:
+                break
+
+        return best
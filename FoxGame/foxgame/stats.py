@@ -0,0 +1,246 @@
+"""
+stats.py: constant memory accumulators for statistics over many games.
+"""
+from __future__ import division
+from math import ceil, erf, log, sqrt
+
+
+def normal_cdf(x):
+    """
+    Cumulative distribution function of the standard normal distribution.
+    """
+    return (1 + erf(x / sqrt(2))) / 2
+
+
+def normal_ppf(p):
+    """
+    Inverse of normal_cdf, p in (0, 1).
+    """
+    if not 0 < p < 1:
+        raise ValueError('probability must be in (0, 1)')
+
+    # bisection: normal_cdf is monotonic
+    low, high = -40.0, 40.0
+    for x in xrange(100):
+        mid = (low + high) / 2
+        if normal_cdf(mid) < p:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+class QuantileSketch(object):
+    """
+    A mergeable sketch estimating quantiles with bounded relative error,
+    storing counts of values into logarithmic buckets (as DDSketch does).
+
+    Each quantile is estimated within 'accuracy' relative error; values
+    nearer to zero than 'mindist' are counted as zero. When more than
+    'maxbuckets' buckets are used, the ones nearest to zero are collapsed,
+    so memory is bounded whatever the number of values added.
+    """
+
+    def __init__(self, accuracy=0.01, mindist=1e-9, maxbuckets=2048):
+        self.accuracy = accuracy
+        self.mindist = mindist
+        self.maxbuckets = maxbuckets
+
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.loggamma = log(self.gamma)
+
+        self.count = 0
+        self.zeros = 0
+        # bucket index -> count, for positive and negative values
+        self.positive = {}
+        self.negative = {}
+
+    def _index(self, value):
+        return int(ceil(log(value) / self.loggamma))
+
+    def _value(self, index):
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+    def _collapse(self, buckets):
+        """
+        Merge into one the buckets nearest to zero, keeping at most
+        self.maxbuckets buckets.
+        """
+        if len(buckets) <= self.maxbuckets:
+            return
+        indexes = sorted(buckets)
+        keep = indexes[-self.maxbuckets]
+        for index in indexes[:-self.maxbuckets]:
+            buckets[keep] += buckets.pop(index)
+
+    def add(self, value, count=1):
+        """
+        Add value to the sketch, count times.
+        """
+        self.count += count
+        if value > self.mindist:
+            index = self._index(value)
+            self.positive[index] = self.positive.get(index, 0) + count
+            self._collapse(self.positive)
+        elif value < -self.mindist:
+            index = self._index(-value)
+            self.negative[index] = self.negative.get(index, 0) + count
+            self._collapse(self.negative)
+        else:
+            self.zeros += count
+
+    def merge(self, other):
+        """
+        Add all the values added to another sketch with the same accuracy.
+        """
+        if other.gamma != self.gamma:
+            raise ValueError('can\'t merge sketches with different accuracy')
+
+        self.count += other.count
+        self.zeros += other.zeros
+        for mine, theirs in ((self.positive, other.positive),
+                             (self.negative, other.negative)):
+            for index, count in theirs.iteritems():
+                mine[index] = mine.get(index, 0) + count
+            self._collapse(mine)
+
+    def quantile(self, q):
+        """
+        Return an estimate of the q-quantile, q in [0, 1];
+        None if the sketch is empty.
+        """
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self._value(index)
+
+        seen += self.zeros
+        if seen > rank:
+            return 0
+
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self._value(index)
+
+        return self._value(max(self.positive))
+
+
+class RunningStats(object):
+    """
+    Online count, sum, mean, variance, minimum, maximum and quantiles
+    of a stream of numbers. Two RunningStats can be merged, e.g. when
+    the numbers are collected by different processes.
+    """
+
+    def __init__(self, accuracy=0.01):
+        self.count = 0
+        self.total = 0
+        self.mean = 0.0
+        # sum of squares of differences from the mean
+        self.m2 = 0.0
+
+        self.min = None
+        self.max = None
+
+        self.sketch = QuantileSketch(accuracy)
+
+    def __repr__(self):
+        return '<RunningStats count=%d mean=%g deviation=%g>' % (
+               self.count, self.mean, self.deviation)
+
+    def add(self, value):
+        """
+        Add value to the statistics (Welford's algorithm).
+        """
+        self.count += 1
+        self.total += value
+
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        self.sketch.add(value)
+
+    def merge(self, other):
+        """
+        Add all the values added to other (Chan's parallel algorithm).
+        """
+        if not other.count:
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        if self.max is None or other.max > self.max:
+            self.max = other.max
+
+        self.sketch.merge(other.sketch)
+
+    @property
+    def variance(self):
+        """
+        Population variance.
+        """
+        return self.m2 / self.count if self.count else 0
+
+    @property
+    def sample_variance(self):
+        """
+        Unbiased sample variance.
+        """
+        return self.m2 / (self.count - 1) if self.count > 1 else 0
+
+    @property
+    def deviation(self):
+        """
+        Population standard deviation.
+        """
+        return sqrt(self.variance)
+
+    @property
+    def error(self):
+        """
+        Standard error of the mean.
+        """
+        return sqrt(self.sample_variance / self.count) if self.count else 0
+
+    def interval(self, confidence=0.95):
+        """
+        Return the half width of the confidence interval of the mean,
+        using the normal approximation.
+        """
+        return normal_ppf((1 + confidence) / 2) * self.error
+
+    def quantile(self, q):
+        """
+        Return an estimate of the q-quantile, q in [0, 1], within the
+        values added (the sketch alone may fall slightly outside them);
+        None if no value has been added.
+        """
+        if not self.count:
+            return None
+        # extremes are known exactly
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        return min(max(self.sketch.quantile(q), self.min), self.max)
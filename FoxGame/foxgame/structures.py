@@ -4,48 +4,75 @@ structures.py: core classes Vector and Direction.
 
 from __future__ import division
 from math import hypot
+from operator import itemgetter
 
+# build tuple subclasses instances skipping their __new__
+_new = tuple.__new__
 
-class Vector(object):
+
+class Vector(tuple):
     """
     A point identified on a cartesian plane.
+
+    Vector is an immutable object: components are stored in a tuple,
+    and can't be reassigned.
     """
+    __slots__ = ()
 
-    def __init__(self, x, y):
-        self.__dict__['x'] = x
-        self.__dict__['y'] = y
+    def __new__(cls, x, y):
+        return tuple.__new__(cls, (x, y))
 
-    def __setattr__(self, name, value):
-        """
-        Vector is an immutable object, so raises if user tries to
-        reassign components.
-        """
-        if name in 'xy':
-            raise AttributeError('can\'t set attribute.')
+    x = property(itemgetter(0))
+    y = property(itemgetter(1))
+
+    def __reduce__(self):
+        return Vector, tuple(self)
 
     def __nonzero__(self):
         """
         Return True if x and y are different from 0, false otherwise.
         """
-        return self.x != 0 or self.y != 0
+        x, y = self
+        return x != 0 or y != 0
 
     def __add__(self, other):
         """
         (x, y) + (a, b) <==> (x+a, y+b).
         """
-        return Vector(self.x+other.x, self.y+other.y)
+        x, y = self
+        a, b = other
+        return _new(Vector, (x+a, y+b))
+
+    def __radd__(self, other):
+        """
+        (a, b) + (x, y) <==> (a+x, b+y), not a tuple concatenation.
+        """
+        x, y = self
+        a, b = other
+        return _new(Vector, (a+x, b+y))
 
     def __sub__(self, other):
         """
         (x, y) - (a, b) <==> (x-a, y-b).
         """
-        return Vector(self.x-other.x, self.y-other.y)
+        x, y = self
+        a, b = other
+        return _new(Vector, (x-a, y-b))
+
+    def __rsub__(self, other):
+        """
+        (a, b) - (x, y) <==> (a-x, b-y).
+        """
+        x, y = self
+        a, b = other
+        return _new(Vector, (a-x, b-y))
 
     def __mul__(self, other):
         """
         (x, y) * scalar <==> (x*scalar, y*scalar).
         """
-        return Vector(self.x*other, self.y*other)
+        x, y = self
+        return _new(Vector, (x*other, y*other))
 
     __rmul__ = __mul__
 
@@ -53,13 +80,15 @@ class Vector(object):
         """
         (x, y) / scalar <==> (x/scalar, y/scalar).
         """
-        return Vector(self.x/other, self.y/other)
+        x, y = self
+        return _new(Vector, (x/other, y/other))
 
     def __floordiv__(self, other):
         """
         (x, y) // scalar <==> (x//scalar, y//scalar)
         """
-        return Vector(self.x//other, self.y//other)
+        x, y = self
+        return _new(Vector, (x//other, y//other))
 
     __truediv__ = __div__
 
@@ -67,7 +96,8 @@ class Vector(object):
         """
         -(x, y) <==> (-x, -y)
         """
-        return -1 * self
+        x, y = self
+        return _new(Vector, (-1*x, -1*y))
 
     def __eq__(self, other):
         """
@@ -77,6 +107,11 @@ class Vector(object):
         sx, sy = other
         return fx == sx and fy == sy
 
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = tuple.__hash__
+
     def __lt__(self, other):
         return all(x < y for x, y in zip(self, other))
 
@@ -93,7 +128,7 @@ class Vector(object):
         """
         Return the euclidean distance.
         """
-        return hypot(self.x, self.y)
+        return hypot(*self)
 
     def __repr__(self):
         return '<Vector(x=%f, y=%f)>' % (self.x, self.y)
@@ -101,18 +136,13 @@ class Vector(object):
     def __str__(self):
         return 'Vector(x=%f, y=%f)' %(self.x, self.y)
 
-    def __iter__(self):
-        """
-        Used just for unpacking.
-        """
-        yield self.x
-        yield self.y
-
     def distance(self, other):
         """
         Return the distance between two vectors.
         """
-        return abs(self - other)
+        x, y = self
+        a, b = other
+        return hypot(x-a, y-b)
 
     def normalize(self, norm=1):
         """
@@ -121,14 +151,18 @@ class Vector(object):
         return self * (norm / abs(self))
 
 
-class Direction(object):
+class Direction(tuple):
     """
     A Direction object identifies a general direction using just two ints,
     with values in range [-1, +1]:
      +1 -> positive shift
      -1 -> negative shift
       0 -> void
+
+    There are only nine directions, so Direction(...) always returns one
+    of the nine immutable instances stored in Direction.instances.
     """
+    __slots__ = ()
 
     # define constants directions
     UP        = ( 0, -1)
@@ -154,24 +188,27 @@ class Direction(object):
             NULL     : '-'
     }
 
-    def __init__(self, dir):
-        h, v = dir
+    # filled in below with the nine Direction instances
+    instances = {}
 
-        if (h in (-1, 0, 1) and
-            v in (-1, 0, 1)):
-            self.__dict__['hor'] = h
-            self.__dict__['vert'] = v
-        else:
+    def __new__(cls, dir):
+        try:
+            return cls.instances[dir]
+        except (KeyError, TypeError):
+            # dir may be a list or a generator
+            pass
+
+        try:
+            return cls.instances[tuple(dir)]
+        except KeyError:
             raise ValueError('Direction\'s attributes must be either'
                              '-1, 0, or 1.')
 
-    def __setattr__(self, name, value):
-        """
-        Direction is an imutable object, sp raises if user tries to
-        reassign components.
-        """
-        if name in ('hor', 'vert'):
-            raise AttributeError('can\'t set attribute.')
+    hor = property(itemgetter(0))
+    vert = property(itemgetter(1))
+
+    def __reduce__(self):
+        return Direction, (tuple(self), )
 
     def __repr__(self):
         return '<Direction object (%d, %d)>' % (self.hor, self.vert)
@@ -187,7 +224,8 @@ class Direction(object):
         """
         Return the opposite position of self.
         """
-        return Direction((-self.hor, -self.vert))
+        h, v = self
+        return self.instances[-h, -v]
 
     def __eq__(self, other):
         fh, fv = self
@@ -203,22 +241,19 @@ class Direction(object):
     def __ne__(self, other):
         return not self == other
 
-    def __nonzero__(self):
-        return self != Direction(self.NULL)
+    __hash__ = tuple.__hash__
 
-    def __iter__(self):
-        """
-        Yield hor and vert: useful for conversion in tuple.
-        """
-        yield self.hor
-        yield self.vert
+    def __nonzero__(self):
+        h, v = self
+        return h != 0 or v != 0
 
     @staticmethod
     def from_vector(vec):
         """
         Convert a Vector into a Direction object.
         """
-        return Direction(sign(x) for x in vec)
+        x, y = vec
+        return Direction.instances[sign(x), sign(y)]
 
     @staticmethod
     def from_string(s):
@@ -229,6 +264,10 @@ class Direction(object):
         return Direction(strdirs[s])
 
 
+Direction.instances.update((dir, _new(Direction, dir))
+                           for dir in Direction.dirs)
+
+
 def sign(num):
     """
     Sign function
@@ -0,0 +1,112 @@
+from __future__ import division
+from unittest import TestCase, skipIf
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from foxgame.factories import ControllerFactory
+from foxgame.gamecore import Game, Fox, Hare
+from foxgame.controllers.traditional import FoxBrain, HareBrain
+
+if numpy is not None:
+    from foxgame.batch import BatchGame
+
+
+class DirectionRecorder(object):
+    """
+    Wrap a Controller storing the last direction returned.
+    """
+
+    batched = False
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.last = None
+
+    def update(self, time):
+        self.last = self.controller.update(time)
+        return self.last
+
+    def destroy(self):
+        self.controller.destroy()
+
+
+@skipIf(numpy is None, 'numpy not available')
+class TestBatchGame(TestCase):
+
+    def setUp(self):
+        self.games = [Game((600, 400),
+                           ControllerFactory(HareBrain),
+                           ControllerFactory(FoxBrain),
+                           3) for x in xrange(4)]
+        for game in self.games:
+            for pawn in game.pawns:
+                pawn.controller = DirectionRecorder(pawn.controller)
+
+    def tearDown(self):
+        for game in self.games:
+            game.end()
+
+    def test_init(self):
+        batch = BatchGame((600, 400), 10, 2)
+        self.assertEqual(batch.fox_pos.shape, (10, 2, 2))
+        self.assertTrue((batch.hare_pos >= 15).all())
+        self.assertTrue((batch.hare_pos <= (600-15, 400-15)).all())
+        self.assertFalse(batch.collisions.any())
+
+    def test_crowding(self):
+        """
+        Foxes are placed apart from each other, as in scalar games.
+        """
+        batch = BatchGame((600, 400), 2000, 2, seed=1)
+        mindist = numpy.hypot(600, 400) / 4
+        dist = numpy.hypot(*(batch.fox_pos[:, 0] - batch.fox_pos[:, 1]).T)
+        # crowded foxes are placed again: fewer than 1 game in 200 keeps them
+        self.assertTrue(((dist - 2*Fox.radius) < mindist / 4).mean() < 0.005)
+        dist = numpy.hypot(*(batch.fox_pos - batch.hare_pos[:, None]).T)
+        self.assertTrue(((dist - Fox.radius - Hare.radius) >= mindist).all())
+
+    def test_equivalence(self):
+        """
+        Tick both engines with the same directions and compare their states.
+        """
+        batch = BatchGame.from_games(self.games)
+        time = 1/32
+
+        for tick in xrange(2000):
+            if not batch.playing.any():
+                break
+
+            results = [game.tick(time) for game in self.games]
+            fox_dirs = [[tuple(fox.controller.last) for fox in game.foxes]
+                        for game in self.games]
+            hare_dirs = [tuple(game.hare.controller.last)
+                         for game in self.games]
+            caught, ate = batch.tick(time, fox_dirs, hare_dirs)
+
+            for i, game in enumerate(self.games):
+                if not batch.playing[i] and not caught[i]:
+                    continue
+                self.assertEqual(caught[i], results[i] is False)
+                self.assertEqual(ate[i], results[i] is True)
+                for j, fox in enumerate(game.foxes):
+                    self.assertAlmostEqual(batch.fox_pos[i, j, 0], fox.pos.x)
+                    self.assertAlmostEqual(batch.fox_pos[i, j, 1], fox.pos.y)
+                    self.assertAlmostEqual(batch.fox_speed[i, j, 0],
+                                           fox.speed.x)
+                    self.assertAlmostEqual(batch.fox_speed[i, j, 1],
+                                           fox.speed.y)
+                self.assertAlmostEqual(batch.hare_pos[i, 0], game.hare.pos.x)
+                self.assertAlmostEqual(batch.hare_pos[i, 1], game.hare.pos.y)
+                self.assertAlmostEqual(batch.hare_speed[i, 0],
+                                       game.hare.speed.x)
+                self.assertAlmostEqual(batch.hare_speed[i, 1],
+                                       game.hare.speed.y)
+                self.assertEqual(batch.carrots[i], game.hare.carrots)
+
+                # carrots are placed randomly: keep them synchronized
+                batch.carrot_pos[i] = tuple(game.carrot.pos)
+
+        self.assertFalse(batch.playing.any())
@@ -28,3 +28,24 @@ class TestFactory(TestCase):
         gfactory = GameFactory((300, 300), self.hfactory, self.ffactory)
         self.assertTrue(isinstance(gfactory.new_game(),
                                    Game))
+
+    def test_game_factory_seed(self):
+        gfactories = [GameFactory((300, 300), self.hfactory, self.ffactory,
+                                  seed=seed) for seed in (1, 1, 2)]
+
+        for i in xrange(5):
+            first, same, other = [gfact.new_game() for gfact in gfactories]
+            self.assertEqual(first.seed, same.seed)
+            self.assertNotEqual(first.seed, other.seed)
+            self.assertEqual([x.pos for x in first.objects],
+                             [x.pos for x in same.objects])
+
+    def test_game_factory_random_seed(self):
+        """
+        Factories without a seed keep the one they chose.
+        """
+        gfactory = GameFactory((300, 300), self.hfactory, self.ffactory)
+        self.assertEqual(gfactory.info['seed'], gfactory.seed)
+        again = GameFactory((300, 300), self.hfactory, self.ffactory,
+                            seed=gfactory.seed)
+        self.assertEqual(gfactory.new_game().seed, again.new_game().seed)
@@ -4,8 +4,52 @@ from unittest import TestCase
 from foxgame.factories import ControllerFactory
 from foxgame.structures import Vector, Direction
 from foxgame.gamecore import (GameObject, MovingPawn, Game,
-                              Carrot, Hare, Fox)
+                              Carrot, Hare, Fox, time_of_impact, tick_games)
+from foxgame.controller import Brain
 from foxgame.controllers.traditional import FoxBrain, HareBrain
+from foxgame.controllers import void
+
+
+class LeftBrain(Brain):
+    """
+    Always run to the left.
+    """
+
+    def update(self, time):
+        return Direction(Direction.LEFT)
+
+
+class CountingBrain(FoxBrain):
+    """
+    Count calls to set_up, tear_down and episode hooks.
+    """
+
+    def set_up(self):
+        self.calls = ['set_up']
+
+    def tear_down(self):
+        self.calls.append('tear_down')
+
+    def new_episode(self):
+        self.calls.append('new_episode')
+
+    def end_episode(self):
+        self.calls.append('end_episode')
+
+
+class BatchFoxBrain(FoxBrain):
+    """
+    A traditional fox deciding for all the foxes at once.
+    """
+
+    batches = []
+
+    def observe(self):
+        return self
+
+    def update_batch(self, observations, time):
+        BatchFoxBrain.batches.append(len(observations))
+        return [brain.update(time) for brain in observations]
 
 
 class TestGameObject(TestCase):
@@ -172,3 +216,184 @@ class TestGame(TestCase):
         self.assertEqual(ffox.pos, self.game.hare.pos)
         self.assertTrue(self.game._collision(self.game.hare, ffox))
         self.assertTrue(self.game.collision)
+
+    def test_time_of_impact(self):
+        still = Vector(100, 100)
+        # crossing each other
+        toi = time_of_impact(Vector(0, 100), Vector(200, 100),
+                             still, still, 10)
+        self.assertAlmostEqual(toi, 0.45)
+        # already touching
+        self.assertEqual(time_of_impact(still, still, still, still, 10), 0)
+        # passing by, too far
+        self.assertEqual(time_of_impact(Vector(0, 0), Vector(200, 0),
+                                        still, still, 10), None)
+        # moving away
+        self.assertEqual(time_of_impact(Vector(80, 100), Vector(0, 100),
+                                        still, still, 10), None)
+        # stopping before
+        self.assertEqual(time_of_impact(Vector(0, 100), Vector(50, 100),
+                                        still, still, 10), None)
+
+    def test_swept_collision(self):
+        """
+        A fox running through the hare in a single long tick catches it.
+        """
+        game = Game((600, 400),
+                    ControllerFactory(void.HareBrain),
+                    ControllerFactory(LeftBrain))
+        fox = game.foxes[0]
+        game.hare.pos = Vector(300, 200)
+        game.carrot.pos = Vector(100, 100)
+        fox.pos = Vector(360, 200)
+        fox.speed = Vector(-Fox.bspeed, 0)
+
+        self.assertFalse(game.collision)
+        self.assertEqual(game.tick(1), False)
+        # the fox ran over the hare
+        self.assertTrue(fox.pos.x < game.hare.pos.x - 50)
+        self.assertFalse(game.collision)
+
+    def test_snapshot(self):
+        """
+        A restored game must be played just like the original one.
+        """
+        for i in xrange(10):
+            self.game.tick(1/32)
+        snapshot = self.game.snapshot()
+
+        def play():
+            results = [self.game.tick(1/32) for i in xrange(200)]
+            return (results, self.game.hare.carrots, self.game.time_elapsed,
+                    [pawn.pos for pawn in self.game.objects])
+
+        first = play()
+        self.game.restore(snapshot)
+        self.assertEqual(self.game.snapshot(), snapshot)
+        self.assertEqual(play(), first)
+
+    def test_observation(self):
+        """
+        The observation is shared until pawns move, and matches the game.
+        """
+        game = self.game
+        observation = game.observation
+        hare = game.hare
+
+        self.assertTrue(game.observation is observation)
+        self.assertTrue(observation.nearest_fox is
+                        min(game.foxes, key=lambda fox: hare.distance(fox)))
+        self.assertEqual(observation.distances,
+                         tuple(hare.distance(fox) for fox in game.foxes))
+        self.assertEqual(observation.offsets,
+                         tuple(hare.pos - fox.pos for fox in game.foxes))
+        self.assertEqual(observation.nearest_distance,
+                         min(observation.distances))
+        features = observation.features((300, 300), 500)
+        self.assertEqual(len(features), 10)
+        self.assertTrue(observation.features((300, 300), 500) is features)
+
+        game.tick(1/32)
+        self.assertFalse(game.observation is observation)
+        observation = game.observation
+        hare.pos = hare.pos + Vector(1, 0)
+        self.assertFalse(game.observation is observation)
+        self.assertEqual(game.observation.offsets[0],
+                         hare.pos - game.foxes[0].pos)
+
+        snapshot = game.snapshot()
+        features = game.observation.features((300, 300), 500)
+        game.tick(1/32)
+        game.restore(snapshot)
+        self.assertEqual(game.observation.features((300, 300), 500),
+                         features)
+
+    def test_reset(self):
+        """
+        A reset game must be placed like a new game with the same seed.
+        """
+        game = Game((300, 300),
+                    ControllerFactory(HareBrain),
+                    ControllerFactory(CountingBrain),
+                    self.foxnum, 1)
+        controllers = [pawn.controller for pawn in game.pawns]
+        for i in xrange(100):
+            game.tick(1/32)
+
+        game.reset(42)
+        new = Game((300, 300),
+                   ControllerFactory(HareBrain),
+                   ControllerFactory(FoxBrain),
+                   self.foxnum, 42)
+
+        self.assertEqual(game.time_elapsed, 0)
+        self.assertEqual(game.hare.carrots, 0)
+        self.assertEqual(controllers, [pawn.controller for pawn in game.pawns])
+        self.assertEqual(game.snapshot(), new.snapshot())
+        self.assertEqual(game.foxes[0].controller.brain.calls,
+                         ['set_up', 'end_episode', 'new_episode'])
+
+    def test_seed(self):
+        """
+        Games with the same seed must be played the same way.
+        """
+        games = [Game((300, 300),
+                      ControllerFactory(HareBrain),
+                      ControllerFactory(FoxBrain),
+                      self.foxnum, seed) for seed in (42, 42, 43)]
+
+        for i in xrange(200):
+            for game in games:
+                game.tick(1/32)
+
+        first, same, other = [[pawn.pos for pawn in game.objects]
+                              for game in games]
+        self.assertEqual(first, same)
+        self.assertNotEqual(first, other)
+
+
+class TestTickGames(TestCase):
+
+    def new_games(self, fox_brain):
+        return [Game((300, 300), ControllerFactory(HareBrain),
+                     ControllerFactory(fox_brain), 3, seed)
+                for seed in xrange(4)]
+
+    def test_batch(self):
+        """
+        Games ticked together must be played as if ticked one by one.
+        """
+        BatchFoxBrain.batches = []
+        games = self.new_games(FoxBrain)
+        batched = self.new_games(BatchFoxBrain)
+
+        for x in xrange(100):
+            playing = [i for i, game in enumerate(games) if not game.ended]
+            if not playing:
+                break
+
+            results = [games[i].tick(0.05) for i in playing]
+            self.assertEqual(tick_games([batched[i] for i in playing], 0.05),
+                             results)
+            for i, result in zip(playing, results):
+                self.assertEqual(games[i].snapshot()[:-1],
+                                 batched[i].snapshot()[:-1])
+                if result is False:
+                    games[i].end()
+                    batched[i].end()
+
+        # foxes of all the games playing decided together
+        self.assertEqual(BatchFoxBrain.batches[0], 12)
+
+    def test_fallback(self):
+        """
+        A single brain of a class uses update.
+        """
+        BatchFoxBrain.batches = []
+        game = Game((300, 300), ControllerFactory(HareBrain),
+                    ControllerFactory(BatchFoxBrain), 1)
+        tick_games([game], 0.05)
+        game.tick(0.05)
+        game.end()
+
+        self.assertEqual(BatchFoxBrain.batches, [])
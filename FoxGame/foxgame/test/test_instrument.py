@@ -0,0 +1,104 @@
+from unittest import TestCase
+from tempfile import mkstemp
+from os import close, remove
+
+from foxgame.factories import ControllerFactory
+from foxgame.gamecore import Game, tick_games
+from foxgame.controllers.traditional import FoxBrain, HareBrain
+from foxgame.structures import Direction
+from foxgame.controllers.benchmark import Benchmark
+from foxgame import instrument
+
+
+class BatchHareBrain(HareBrain):
+    """
+    A hare brain deciding together with the others.
+    """
+
+    def update_batch(self, observations, time):
+        return [Direction.from_vector((1, 0)) for x in observations]
+
+
+class TestInstrument(TestCase):
+
+    def setUp(self):
+        fd, self.dest = mkstemp()
+        close(fd)
+        self.recorder = instrument.enable(self.dest)
+
+    def tearDown(self):
+        instrument.disable()
+        Benchmark.dest = None
+        remove(self.dest)
+
+    def new_game(self):
+        Benchmark.dest = self.dest + '.benchmark'
+        return Game((300, 300),
+                    ControllerFactory(HareBrain, [Benchmark]),
+                    ControllerFactory(FoxBrain), 2, seed=1)
+
+    def test_disabled(self):
+        instrument.disable()
+        game = self.new_game()
+        game.tick(0.1)
+        game.end()
+        remove(Benchmark.dest)
+
+        self.assertEqual(game.recorder, None)
+        self.assertEqual(game.hare.controller.recorder, None)
+        self.assertEqual(self.recorder.latencies, {})
+
+    def test_record(self):
+        game = self.new_game()
+        for x in xrange(10):
+            if game.tick(0.05) is False:
+                break
+        ticks = x + 1
+        game.end()
+        remove(Benchmark.dest)
+
+        # reports are dumped on exit, not by each game
+        with open(self.dest) as report:
+            self.assertEqual(report.read(), '')
+        self.recorder.dump()
+
+        latencies = self.recorder.latencies
+        for name in ('brain:traditional.HareBrain',
+                     'postfilter:benchmark.Benchmark', 'drive:Hare',
+                     'collision'):
+            self.assertEqual(latencies[name].count, ticks)
+        self.assertEqual(latencies['brain:traditional.FoxBrain'].count,
+                         2*ticks)
+        self.assertEqual(latencies['drive:Fox'].count, 2*ticks)
+
+        with open(self.dest) as report:
+            text = report.read()
+        self.assertTrue(text.startswith('component'))
+        self.assertTrue('drive:Fox' in text)
+
+    def test_merge(self):
+        other = instrument.Recorder()
+        other.record('drive:Fox', 1e-5)
+        self.recorder.record('drive:Fox', 3e-5)
+        self.recorder.merge(other)
+
+        stats = self.recorder.latencies['drive:Fox']
+        self.assertEqual(stats.count, 2)
+        self.assertAlmostEqual(stats.mean, 2e-5)
+
+    def test_batch(self):
+        """
+        Brains deciding together are timed by a single call.
+        """
+        games = [Game((300, 300), ControllerFactory(BatchHareBrain),
+                      ControllerFactory(FoxBrain), 1, seed=seed)
+                 for seed in (1, 2)]
+        tick_games(games, 0.05)
+        for game in games:
+            game.end()
+
+        latencies = self.recorder.latencies
+        self.assertEqual(
+            latencies['brain:test_instrument.BatchHareBrain[batch]'].count, 1)
+        self.assertFalse('brain:test_instrument.BatchHareBrain' in latencies)
+        self.assertEqual(latencies['drive:Hare'].count, 2)
@@ -0,0 +1,59 @@
+from unittest import TestCase
+from tempfile import mkdtemp
+from shutil import rmtree
+from os.path import join as osjoin
+
+from foxgame import perfsuite
+from foxgame.structures import Vector, Direction
+from foxgame.controllers import rl
+
+
+class TestPerfSuite(TestCase):
+
+    def setUp(self):
+        self.dir = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.dir)
+
+    def test_allocations(self):
+        vector_new, direction_new = Vector.__new__, Direction.__new__
+        with perfsuite.AllocationCounter() as counter:
+            a = Vector(1, 2) + Vector(3, 4)
+            Direction((1, 0))
+        self.assertEqual(counter.vectors, 3)
+        self.assertEqual(counter.directions, 1)
+
+        # counting stops on exit
+        self.assertEqual(Vector.__new__, vector_new)
+        self.assertEqual(Direction.__new__, direction_new)
+        Vector(0, 0) * 2
+        self.assertEqual(counter.vectors, 3)
+
+    def test_measure(self):
+        result = perfsuite.measure(perfsuite.VectorCase('vector'), 0.01, 10)
+        self.assertEqual(result['case'], 'vector')
+        self.assertTrue(result['ops_per_sec'] > 0)
+        self.assertEqual(result['vectors_per_op'], 5)
+
+    def test_game_case(self):
+        net_file = rl.HareBrain.net_file
+        result = perfsuite.measure(perfsuite.GameCase('rl', hare_brain='rl'),
+                                   0.01, 10)
+        self.assertTrue(result['ops'] > 0)
+        self.assertEqual(rl.HareBrain.net_file, net_file)
+
+    def test_history(self):
+        path = osjoin(self.dir, 'history.jsonl')
+        self.assertEqual(perfsuite.load_history(path), [])
+
+        results = list(perfsuite.run(['vector'], 0.01))
+        perfsuite.save_run(path, results, 'first')
+        perfsuite.save_run(path, results)
+
+        history = perfsuite.load_history(path)
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history[0]['label'], 'first')
+        self.assertEqual(history[1]['results'], results)
+        self.assertTrue('+0.0%' in perfsuite.format_results(results,
+                                                            history[0]))
@@ -0,0 +1,67 @@
+from unittest import TestCase
+from tempfile import mkdtemp
+from shutil import rmtree
+from os.path import join as osjoin
+import pstats
+
+from foxgame import profiling
+from foxgame.factories import ControllerFactory
+from foxgame.gamecore import Game
+from foxgame.controllers.traditional import FoxBrain, HareBrain
+
+
+def play():
+    game = Game((300, 300), ControllerFactory(HareBrain),
+                ControllerFactory(FoxBrain), 3, seed=4)
+    for x in xrange(200):
+        game.tick(0.01)
+    game.end()
+
+
+class TestProfiling(TestCase):
+
+    def setUp(self):
+        self.dir = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.dir)
+
+    def test_subsystem(self):
+        for filename, name in (
+            ('/a/foxgame/gamecore.py', 'gamecore'),
+            ('/a/foxgame/controllers/nn.py', 'controllers'),
+            ('/a/foxgame/controllers/libs/neuralnet/nn.py', 'libs.neuralnet'),
+            ('/a/foxgame/controllers/libs/fuzzy/fuzzy.py', 'libs.fuzzy'),
+            ('/a/foxgame/UI/simulator.py', 'UI'),
+            ('/usr/lib/python2.7/random.py', 'other'),
+            ('~', 'other')):
+            self.assertEqual(profiling.subsystem(filename), name)
+
+    def test_deterministic(self):
+        dest = osjoin(self.dir, 'profile.pstats')
+        report = profiling.deterministic(play, dest)
+
+        stats = pstats.Stats(dest)
+        self.assertTrue(stats.total_tt > 0)
+        self.assertTrue('gamecore' in report)
+        self.assertTrue('controllers' in report)
+
+    def test_sampling(self):
+        sampler = profiling.Sampler(0.0005)
+        sampler.start()
+        try:
+            while sampler.samples < 20:
+                play()
+        finally:
+            sampler.stop()
+
+        dest = osjoin(self.dir, 'profile.collapsed')
+        sampler.save(dest)
+        with open(dest) as collapsed:
+            lines = collapsed.read().splitlines()
+        self.assertEqual(sum(int(line.rsplit(' ', 1)[1]) for line in lines),
+                         sampler.samples)
+        self.assertTrue(any('play' in line for line in lines))
+
+        functions = sampler.functions()
+        self.assertEqual(sum(func[3] for func in functions), sampler.samples)
@@ -0,0 +1,97 @@
+from __future__ import division
+from unittest import TestCase
+from tempfile import mkdtemp
+from shutil import rmtree
+from os.path import join as osjoin, exists
+
+from foxgame.stats import RunningStats
+from foxgame.factories import ControllerFactory, GameFactory
+from foxgame.controllers.traditional import FoxBrain, HareBrain
+from foxgame.UI.simulator import GUI
+from foxgame import results
+
+
+def fill(values):
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    return stats
+
+
+class TestResults(TestCase):
+
+    def setUp(self):
+        self.dir = mkdtemp()
+        self.record = results.make_record(
+                          {'hare_brain': 'traditional', 'seed': None,
+                           'extraopts': {'hare_brain': {}}},
+                          {'cpm': fill(range(100)),
+                           'ticks': fill([32] * 100)},
+                          walltime=2)
+
+    def tearDown(self):
+        rmtree(self.dir)
+
+    def test_record(self):
+        self.assertEqual(self.record['games'], 100)
+        self.assertEqual(self.record['ticks_per_sec'], 1600)
+        cpm = self.record['metrics']['cpm']
+        self.assertAlmostEqual(cpm['mean'], 49.5)
+        self.assertTrue(45 < cpm['p50'] < 55)
+        self.assertTrue(cpm['ci'] > 0)
+
+    def test_save(self):
+        for name in ('result.json', 'result.csv'):
+            path = osjoin(self.dir, name)
+            results.save(self.record, path)
+            self.assertEqual(results.load(path), self.record)
+
+    def test_compare(self):
+        worse = results.make_record({}, {'cpm': fill(range(-20, 80))}, 1)
+        same = results.make_record({}, {'cpm': fill(range(99, -1, -1))}, 1)
+
+        (metric, old, new, diff, pvalue, status), = results.compare(
+                                                        self.record, worse)
+        self.assertEqual(metric, 'cpm')
+        self.assertAlmostEqual(diff, -20)
+        self.assertEqual(status, 'regression')
+
+        (row,) = results.compare(worse, self.record)
+        self.assertEqual(row[-1], 'improvement')
+
+        (row,) = results.compare(self.record, same)
+        self.assertEqual(row[-1], '')
+        self.assertAlmostEqual(row[-2], 1)
+
+
+class ResultGUI(GUI):
+    games = 5
+
+
+class TestSimulatorResult(TestCase):
+
+    def setUp(self):
+        self.dir = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.dir)
+
+    def test_result(self):
+        gfact = GameFactory((300, 300),
+                            ControllerFactory(HareBrain),
+                            ControllerFactory(FoxBrain), seed=2)
+        ResultGUI.result = osjoin(self.dir, 'result.json')
+
+        gui = ResultGUI(gfact)
+        gui.run()
+        gui.save_result()
+        gui.game.end()
+
+        self.assertTrue(exists(ResultGUI.result))
+        record = results.load(ResultGUI.result)
+        self.assertEqual(record['games'], ResultGUI.games)
+        self.assertEqual(record['info']['seed'], 2)
+        self.assertEqual(record['info']['simulator']['games'], 5)
+        self.assertTrue(record['ticks_per_sec'] > 0)
+        for metric in results.QUALITY + results.THROUGHPUT:
+            self.assertEqual(record['metrics'][metric]['count'], 5)
@@ -0,0 +1,159 @@
+from unittest import TestCase
+from tempfile import mkdtemp
+from shutil import rmtree
+from os.path import join as osjoin
+
+from foxgame.factories import ControllerFactory, GameFactory
+from foxgame.controllers.traditional import FoxBrain, HareBrain
+from foxgame.UI.simulator import GUI
+from foxgame.gamecore import FoxGameError
+from foxgame import results
+
+
+class SerialGUI(GUI):
+    games = 12
+
+
+class ParallelGUI(SerialGUI):
+    workers = 3
+
+
+class BatchGUI(SerialGUI):
+    batch = 5
+
+
+class StoppingGUI(GUI):
+    games = 1000
+    ci = 10
+    mingames = 20
+
+
+class ParallelStoppingGUI(StoppingGUI):
+    workers = 3
+
+
+class RivalGUI(GUI):
+    games = 1000
+    rival = 'void'
+    mingames = 20
+
+
+class InvalidRivalGUI(GUI):
+    rival = 'none'
+
+
+class TestSimulator(TestCase):
+    """
+    Test the simulator GUI without printing its results.
+    """
+
+    def new_factory(self):
+        return GameFactory((300, 300),
+                           ControllerFactory(HareBrain),
+                           ControllerFactory(FoxBrain),
+                           2, seed=7)
+
+    def test_parallel(self):
+        """
+        Games played in parallel must give the same results.
+        """
+        serial = SerialGUI(self.new_factory())
+        serial.run()
+        serial.game.end()
+
+        parallel = ParallelGUI(self.new_factory())
+        parallel.run_parallel()
+        parallel.game.end()
+
+        self.assertEqual(serial.store['carrots'].count, SerialGUI.games)
+        self.assertEqual(sorted(serial.store), sorted(parallel.store))
+        for key, stats in serial.store.iteritems():
+            if key == 'tps':
+                # ticks per second depend on the machine load
+                continue
+            merged = parallel.store[key]
+            self.assertEqual(stats.count, merged.count)
+            self.assertAlmostEqual(stats.total, merged.total)
+            self.assertAlmostEqual(stats.mean, merged.mean)
+            self.assertAlmostEqual(stats.variance, merged.variance)
+            self.assertEqual((stats.min, stats.max), (merged.min, merged.max))
+            self.assertEqual(stats.quantile(.5), merged.quantile(.5))
+
+    def test_early_stopping(self):
+        """
+        Stop when the confidence interval is narrow enough,
+        at the same game when playing in parallel.
+        """
+        serial = StoppingGUI(self.new_factory())
+        serial.run()
+        serial.game.end()
+
+        parallel = ParallelStoppingGUI(self.new_factory())
+        parallel.run_parallel()
+        parallel.game.end()
+
+        self.assertEqual(serial.stopped, 'confident')
+        self.assertTrue(serial.scores.count < StoppingGUI.games)
+        self.assertTrue(2*serial.scores.interval() <= StoppingGUI.ci)
+        self.assertEqual(serial.scores.count, parallel.scores.count)
+        self.assertAlmostEqual(serial.scores.mean, parallel.scores.mean)
+        self.assertEqual(serial.store['cpm'].count, serial.scores.count)
+
+    def test_rival(self):
+        """
+        A hare fleeing from foxes must be better than a still one.
+        """
+        gui = RivalGUI(self.new_factory())
+        gui.run()
+        gui.game.end()
+
+        self.assertEqual(gui.stopped, 'better')
+        self.assertTrue(gui.scores.mean > 0)
+
+    def test_invalid_rival(self):
+        """
+        Rivals must be hare brains.
+        """
+        # no brain, no module, a module without hare brains
+        for rival in ('none', 'nosuchbrain', 'processors'):
+            InvalidRivalGUI.rival = rival
+            self.assertRaises(FoxGameError, InvalidRivalGUI,
+                              self.new_factory())
+
+    def test_save_result(self):
+        """
+        Records hold the settings needed to play the same games again.
+        """
+        path = mkdtemp()
+        try:
+            gui = BatchGUI(GameFactory((300, 300),
+                                       ControllerFactory(HareBrain),
+                                       ControllerFactory(FoxBrain), 2))
+            gui.result = osjoin(path, 'result.json')
+            gui.run_batch()
+            gui.save_result()
+            record = results.load(gui.result)
+        finally:
+            rmtree(path)
+
+        self.assertEqual(record['info']['simulator']['batch'], BatchGUI.batch)
+        self.assertEqual(record['info']['seed'], gui.gfact.seed)
+        self.assertNotEqual(record['info']['seed'], None)
+
+    def test_batch(self):
+        """
+        Games played at once must give the same results,
+        in a different order.
+        """
+        serial = SerialGUI(self.new_factory())
+        serial.run()
+        serial.game.end()
+
+        batch = BatchGUI(self.new_factory())
+        batch.run_batch()
+
+        for key in ('carrots', 'time', 'cpm'):
+            self.assertEqual(serial.store[key].count,
+                             batch.store[key].count)
+            self.assertAlmostEqual(serial.store[key].total,
+                                   batch.store[key].total)
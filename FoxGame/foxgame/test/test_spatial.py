@@ -0,0 +1,71 @@
+from __future__ import division
+from unittest import TestCase
+from random import Random
+
+from foxgame.spatial import SpatialGrid
+from foxgame.structures import Vector
+from foxgame.gamecore import GameObject
+
+
+class TestSpatialGrid(TestCase):
+    """
+    Test SpatialGrid queries against a linear scan.
+    """
+
+    def setUp(self):
+        self.random = Random(0)
+        self.size = Vector(600, 400)
+        self.grid = SpatialGrid(self.size, 50)
+        self.objects = [GameObject(None, self.randompoint())
+                        for x in xrange(100)]
+        for obj in self.objects:
+            self.grid.insert(obj)
+
+    def randompoint(self):
+        return Vector(self.random.uniform(0, self.size.x),
+                      self.random.uniform(0, self.size.y))
+
+    def test_insert(self):
+        self.assertEqual(len(self.grid), len(self.objects))
+        self.assertEqual(list(self.grid), self.objects)
+        for obj in self.objects:
+            self.assertTrue(obj in self.grid)
+            self.assertTrue(obj.index is self.grid)
+
+    def test_remove(self):
+        obj = self.objects[0]
+        self.grid.remove(obj)
+        self.assertFalse(obj in self.grid)
+        self.assertFalse(obj in self.grid.near(obj.pos, 1))
+        self.assertTrue(obj.index is None)
+
+    def test_near(self):
+        for x in xrange(50):
+            point = self.randompoint()
+            near = list(self.grid.near(point, 70))
+            for obj in self.objects:
+                if obj.pos.distance(point) <= 70:
+                    self.assertTrue(obj in near)
+
+    def test_nearest(self):
+        for x in xrange(50):
+            point = self.randompoint()
+            self.assertTrue(self.grid.nearest(point) is
+                            min(self.objects,
+                                key=lambda obj: obj.pos.distance(point)))
+
+    def test_move(self):
+        """
+        Moving an object updates its cell.
+        """
+        for obj in self.objects:
+            obj.pos = self.randompoint()
+
+        self.test_near()
+        self.test_nearest()
+
+    def test_clear(self):
+        self.grid.clear()
+        self.assertEqual(len(self.grid), 0)
+        self.assertTrue(self.grid.nearest(Vector(0, 0)) is None)
+        self.assertTrue(self.objects[0].index is None)
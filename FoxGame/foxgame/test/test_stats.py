@@ -0,0 +1,93 @@
+from __future__ import division
+from unittest import TestCase
+from random import Random
+from math import sqrt
+
+from foxgame.stats import QuantileSketch, RunningStats
+
+
+class TestRunningStats(TestCase):
+
+    def setUp(self):
+        random = Random(3)
+        self.values = [random.expovariate(.1) for x in xrange(1000)]
+
+    def fill(self, values):
+        stats = RunningStats()
+        for value in values:
+            stats.add(value)
+        return stats
+
+    def test_empty(self):
+        stats = RunningStats()
+        self.assertEqual(stats.count, 0)
+        self.assertEqual(stats.variance, 0)
+        self.assertEqual(stats.quantile(.5), None)
+
+    def test_moments(self):
+        stats = self.fill(self.values)
+        mean = sum(self.values) / len(self.values)
+        deviation = sqrt(sum((x - mean)**2 for x in self.values) /
+                         len(self.values))
+
+        self.assertEqual(stats.count, len(self.values))
+        self.assertAlmostEqual(stats.total, sum(self.values))
+        self.assertAlmostEqual(stats.mean, mean)
+        self.assertAlmostEqual(stats.deviation, deviation)
+        self.assertEqual(stats.min, min(self.values))
+        self.assertEqual(stats.max, max(self.values))
+
+    def test_quantile_bounds(self):
+        """
+        Quantiles are within the values added, exactly when they are equal.
+        """
+        self.assertEqual(self.fill([1, 1, 1]).quantile(.5), 1)
+        stats = self.fill([3, 8])
+        self.assertEqual(stats.quantile(0), 3)
+        self.assertEqual(stats.quantile(1), 8)
+
+    def test_merge(self):
+        whole = self.fill(self.values)
+        merged = RunningStats()
+        for i in xrange(0, len(self.values), 300):
+            merged.merge(self.fill(self.values[i:i+300]))
+        merged.merge(RunningStats())
+
+        self.assertEqual(merged.count, whole.count)
+        self.assertAlmostEqual(merged.mean, whole.mean)
+        self.assertAlmostEqual(merged.variance, whole.variance)
+        self.assertAlmostEqual(merged.sample_variance, whole.sample_variance)
+        self.assertEqual((merged.min, merged.max), (whole.min, whole.max))
+        for q in (0, .1, .5, .9, 1):
+            self.assertEqual(merged.quantile(q), whole.quantile(q))
+
+
+class TestQuantileSketch(TestCase):
+
+    def test_accuracy(self):
+        random = Random(5)
+        values = sorted(random.gauss(0, 100) for x in xrange(2001))
+        values.extend([0] * 100)
+        values.sort()
+
+        sketch = QuantileSketch(accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+
+        for q in (0, .05, .25, .5, .75, .95, 1):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertTrue(abs(sketch.quantile(q) - exact) <=
+                            0.01 * abs(exact) + 1e-9)
+
+    def test_bounded(self):
+        sketch = QuantileSketch(maxbuckets=10)
+        for x in xrange(1, 10000):
+            sketch.add(x)
+
+        self.assertEqual(len(sketch.positive), 10)
+        self.assertEqual(sketch.count, 9999)
+        self.assertAlmostEqual(sketch.quantile(1), 9999, delta=100)
+
+    def test_merge_accuracy(self):
+        self.assertRaises(ValueError, QuantileSketch(0.01).merge,
+                          QuantileSketch(0.05))
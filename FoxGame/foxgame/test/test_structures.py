@@ -3,6 +3,7 @@ from unittest import TestCase
 from random import randrange
 from operator import sub
 from math import hypot
+from pickle import dumps, loads
 
 from foxgame.structures import Vector, Direction
 
@@ -56,6 +57,15 @@ class TestVector(TestCase):
         self.assertEqual(-self.p1,
                          map(lambda x: -x, self.p1))
 
+    def test_tuple_operands(self):
+        """
+        Tuples on the left are added and subtracted, not concatenated.
+        """
+        total = (1, 2) + Vector(3, 4)
+        self.assertEqual(total, Vector(4, 6))
+        self.assertTrue(isinstance(total, Vector))
+        self.assertEqual((5, 5) - Vector(1, 2), Vector(4, 3))
+
     def test_abs(self):
         self.assertEqual(abs(self.p1), hypot(self.p1.x, self.p1.y))
 
@@ -76,6 +86,10 @@ class TestVector(TestCase):
         self.assertRaises(AttributeError, self.p1.__setattr__, 'x', 1)
         self.assertRaises(AttributeError, self.p2.__setattr__, 'y', 2)
 
+    def test_pickle(self):
+        self.assertEqual(loads(dumps(self.p1, 2)), self.p1)
+        self.assertTrue(isinstance(loads(dumps(self.p1)), Vector))
+
 
 class TestDirection(TestCase):
     """
@@ -141,3 +155,15 @@ class TestDirection(TestCase):
         dir = Direction(Direction.NULL)
         self.assertRaises(AttributeError, dir.__setattr__, 'hor', 1)
         self.assertRaises(AttributeError, dir.__setattr__, 'vert', 3)
+
+    def test_singletons(self):
+        """
+        Equal Directions must be the same object.
+        """
+        dir = Direction(Direction.UPLEFT)
+        self.assertTrue(Direction([-1, -1]) is dir)
+        self.assertTrue(Direction(x for x in (-1, -1)) is dir)
+        self.assertTrue(-Direction(Direction.DOWNRIGHT) is dir)
+        self.assertTrue(Direction.from_vector(Vector(-3, -0.5)) is dir)
+        self.assertTrue(loads(dumps(dir, 2)) is dir)
+        self.assertTrue(loads(dumps(dir)) is dir)
@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from foxgame import tournament
+from foxgame.controllers import nn
+
+FOXES = [('traditional', {}), ('void', {})]
+HARES = [('traditional', {}), ('void', {})]
+
+
+class TestTournament(TestCase):
+
+    def play(self, workers):
+        return tournament.run(FOXES, HARES, games=6, seed=1,
+                              workers=workers, looptime=20)
+
+    def test_parallel(self):
+        serial = self.play(1)
+        parallel = self.play(2)
+
+        self.assertEqual(sorted(serial), [(0, 0), (0, 1), (1, 0), (1, 1)])
+        for pairing, scores in serial.iteritems():
+            self.assertEqual(len(scores), 6)
+            for value, other in zip(scores, parallel[pairing]):
+                self.assertAlmostEqual(value, other)
+
+    def test_ranking(self):
+        results = self.play(1)
+        (first, mean, interval), second = tournament.ranking(results, 2, 1)
+        # a still hare can't beat a fleeing one
+        self.assertEqual(first, 0)
+        self.assertTrue(mean >= second[1])
+
+        text = tournament.format_results(results, FOXES, HARES)
+        self.assertTrue('Hare brains' in text)
+        self.assertTrue('Fox brains' in text)
+
+    def test_paired_interval(self):
+        """
+        Pairings of a brain play the same seeds: their scores are
+        correlated, and can't be combined as independent ones.
+        """
+        results = {(0, 0): [1, 10, 30], (0, 1): [2, 11, 31]}
+        ranks = tournament.ranking(results, 2, 1)
+        self.assertEqual([player for player, mean, interval in ranks],
+                         [1, 0])
+
+        (fox, mean, interval), = tournament.ranking(results, 1, 0)
+        paired = tournament.summary([1.5, 10.5, 30.5])
+        self.assertAlmostEqual(mean, paired.mean)
+        self.assertAlmostEqual(interval, paired.interval())
+        # as if independent, the interval would be narrower
+        independent = tournament.summary([1, 10, 30]).interval() / 2**.5
+        self.assertTrue(interval > independent * 1.2)
+
+    def test_configure(self):
+        advance = nn.HareBrain.advance
+        saved = {}
+        try:
+            brain = tournament.configure('nn', 'HareBrain', {'advance': '3'},
+                                         saved)
+            self.assertTrue(brain is nn.HareBrain)
+            self.assertEqual(nn.HareBrain.advance, 3)
+        finally:
+            tournament.restore(saved)
+        self.assertEqual(nn.HareBrain.advance, advance)
+
+        # jobs restore the options they set
+        tournament.play_job(((0, 0), (FOXES[0], ('nn', {'advance': '3'})),
+                             1, [], 1/32., 20))
+        self.assertEqual(nn.HareBrain.advance, advance)
+
+    def test_label(self):
+        self.assertEqual(tournament.label(('nn', {'hiddens': '30',
+                                                  'advance': '3'})),
+                         'nn advance:3 hiddens:30')
@@ -0,0 +1,68 @@
+from __future__ import division
+from unittest import TestCase
+from tempfile import mkdtemp
+from shutil import rmtree
+from os.path import join as osjoin
+from random import Random
+
+from foxgame import tuning
+
+COLUMNS = ('time', 'fox0_x', 'fox0_y', 'fox0_speed_x', 'fox0_speed_y',
+           'hare_x', 'hare_y', 'hare_speed_x', 'hare_speed_y',
+           'carrot_x', 'carrot_y', 'dir_h', 'dir_v')
+
+
+class TestTuning(TestCase):
+
+    def test_grid(self):
+        configs = tuning.grid({'hiddens': ['10', '20'],
+                               'epsilon': ['0.1', '0.2', '0.3']})
+        self.assertEqual(len(configs), 6)
+        self.assertTrue({'hiddens': '20', 'epsilon': '0.3'} in configs)
+        self.assertRaises(ValueError, tuning.grid, {'epsilon': ['0.1..0.2']})
+
+    def test_sample(self):
+        space = {'hiddens': ['10', '20'], 'epsilon': ['0.1', '0.2']}
+        configs = tuning.sample(space, 10, Random(1))
+        # without ranges, configurations are not repeated
+        self.assertEqual(len(configs), 4)
+
+        configs = tuning.sample({'hiddens': ['5..9'],
+                                 'epsilon': ['0.1..0.2']}, 20, Random(1))
+        self.assertEqual(len(configs), 20)
+        for config in configs:
+            self.assertTrue(5 <= int(config['hiddens']) <= 9)
+            self.assertTrue(0.1 <= float(config['epsilon']) <= 0.2)
+
+    def test_halving(self):
+        dir = mkdtemp()
+        try:
+            # a log of a hare running to the right
+            with open(osjoin(dir, 'game.csv'), 'w') as log:
+                print >> log, ','.join(COLUMNS)
+                for i in xrange(300):
+                    print >> log, ','.join(map(str, (
+                        i/32, 500, 200, 0, 0, 100 + i, 200, 50, 0,
+                        300, 300, 1, 0)))
+
+            space = {'hiddens': ['2', '3', '4', '5', '6'],
+                     'examples': [osjoin(dir, '*.csv')],
+                     'cache': [osjoin(dir, 'cache')],
+                     'batch_size': ['16']}
+            records = tuning.run(space, 'halving', epochs=4, min_epochs=1,
+                                 eta=2, games=2, seed=1, workers=1,
+                                 outdir=osjoin(dir, 'trials'), looptime=5)
+        finally:
+            rmtree(dir)
+
+        self.assertEqual([record['epochs'] for record in records],
+                         [1, 1, 1, 1, 1, 2, 2, 4])
+        ranked = tuning.ranking(records)
+        self.assertEqual(len(ranked), 5)
+        self.assertEqual(ranked[0]['epochs'], 4)
+        self.assertEqual(ranked[0]['games'], 2)
+
+        table = tuning.format_results(records)
+        self.assertEqual(len(table.splitlines()), 6)
+        self.assertTrue('hiddens:' in table)
+        self.assertFalse('examples:' in table)
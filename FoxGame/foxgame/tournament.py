@@ -0,0 +1,200 @@
+"""
+tournament.py: round-robin tournaments between fox and hare brains (TOUR).
+
+Every fox brain plays against every hare brain on the same games (the same
+seeds), so differences between brains are not hidden by different starting
+positions: scores are kept for each seed, and brains are compared on the
+same seeds. Pairings are played by a pool of processes.
+
+A brain is given as a (name, extraopts) pair, e.g. ('nn', {'hiddens': '30'}).
+"""
+from __future__ import division
+from multiprocessing import Pool, cpu_count
+from random import Random
+import sys
+
+from foxgame.factories import (GameFactory, ControllerFactory,
+                               load_brain, load_extraopts)
+from foxgame.stats import RunningStats
+from foxgame.UI.simulator import play, score
+
+import logging
+log = logging.getLogger('TOUR')
+
+
+def label(brain):
+    """
+    Return the name of a brain, followed by its extraoptions.
+    """
+    name, extraopts = brain
+    return ' '.join([name] + ['%s:%s' % item
+                              for item in sorted(extraopts.iteritems())])
+
+
+def configure(name, cls_name, extraopts, saved):
+    """
+    Load a brain class setting its extraoptions, and remember their
+    previous values into the dictionary saved, (brain class, option
+    name) -> value: play_job restores them after each job, so brains
+    of the same module can be played with different options.
+    """
+    brain = load_brain(name, cls_name)
+    for option, value in extraopts.iteritems():
+        saved.setdefault((brain, option), getattr(brain, option, None))
+    if extraopts:
+        load_extraopts(sys.modules[brain.__module__], brain, extraopts)
+    return brain
+
+
+def restore(saved):
+    """
+    Set back the options changed by configure.
+    """
+    for (brain, option), value in saved.iteritems():
+        setattr(brain, option, value)
+
+
+def play_job(job):
+    """
+    Play the games of a pairing with the given seeds.
+    Return the pairing and the carrots per minute of each game.
+    """
+    pairing, (fox_brain, hare_brain), foxnum, seeds, timestep, looptime = job
+
+    saved = {}
+    try:
+        gfact = GameFactory((600, 400),
+                            ControllerFactory(configure(hare_brain[0],
+                                                        'HareBrain',
+                                                        hare_brain[1],
+                                                        saved)),
+                            ControllerFactory(configure(fox_brain[0],
+                                                        'FoxBrain',
+                                                        fox_brain[1],
+                                                        saved)),
+                            foxnum)
+
+        scores = []
+        for seed in seeds:
+            game = gfact.new_game(seed)
+            try:
+                play(game, timestep, looptime)
+                scores.append(score(game))
+            finally:
+                game.end()
+    finally:
+        restore(saved)
+
+    return pairing, scores
+
+
+def run(fox_brains, hare_brains, games=100, foxnum=1, seed=None,
+        workers=None, timestep=1/32, looptime=300):
+    """
+    Play 'games' games for each pairing of fox and hare brains,
+    using 'workers' processes (by default, one for each cpu).
+    Return a dictionary (fox index, hare index) -> list of the carrots
+    per minute of each game, in the same order of seeds for all pairings.
+    """
+    workers = workers or cpu_count()
+
+    seeds = Random(seed)
+    seeds = [seeds.randrange(2**32) for x in xrange(games)]
+    chunksize = max(1, games * len(fox_brains) * len(hare_brains) //
+                       (workers * 8))
+
+    jobs = [((fox, hare), (fox_brain, hare_brain), foxnum,
+             seeds[i:i+chunksize], timestep, looptime)
+            for fox, fox_brain in enumerate(fox_brains)
+            for hare, hare_brain in enumerate(hare_brains)
+            for i in xrange(0, games, chunksize)]
+
+    # jobs of a pairing are in the order of their seeds, as imap results
+    results = dict(((fox, hare), [])
+                   for fox in xrange(len(fox_brains))
+                   for hare in xrange(len(hare_brains)))
+
+    if workers == 1:
+        for job in jobs:
+            pairing, scores = play_job(job)
+            results[pairing].extend(scores)
+        return results
+
+    pool = Pool(workers)
+    try:
+        for done, (pairing, scores) in enumerate(pool.imap(play_job, jobs)):
+            results[pairing].extend(scores)
+            log.info('%d/%d jobs done' % (done + 1, len(jobs)))
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    return results
+
+
+def summary(scores):
+    """
+    Return the RunningStats of a list of scores.
+    """
+    stats = RunningStats()
+    for value in scores:
+        stats.add(value)
+    return stats
+
+
+def ranking(results, players, axis, confidence=0.95):
+    """
+    Rank fox (axis=0) or hare (axis=1) brains by the mean of their
+    pairings' carrots per minute. Return a list of (index, mean,
+    confidence interval half width), sorted by mean.
+
+    Pairings play the same seeds, so their scores are not independent:
+    the interval is the one of the mean over seeds of the mean score
+    of the brain's pairings on each seed.
+    """
+    ranks = []
+    for player in xrange(players):
+        pairings = [scores for pairing, scores in results.iteritems()
+                    if pairing[axis] == player]
+        stats = summary(sum(game_scores) / len(game_scores)
+                        for game_scores in zip(*pairings))
+        ranks.append((player, stats.mean, stats.interval(confidence)))
+
+    # hares want to eat many carrots, foxes to let them eat few
+    return sorted(ranks, key=lambda rank: rank[1], reverse=bool(axis))
+
+
+def format_results(results, fox_brains, hare_brains, confidence=0.95):
+    """
+    Return the ranking tables and the table of all pairings.
+    """
+    lines = []
+    for title, brains, axis in (
+            ('Hare brains (carrots per minute, higher is better)',
+             hare_brains, 1),
+            ('Fox brains (carrots per minute allowed, lower is better)',
+             fox_brains, 0)):
+        lines.append(title + ':')
+        for position, (player, mean, interval) in enumerate(
+                ranking(results, len(brains), axis, confidence)):
+            lines.append('%3d. %-30s %8.2f +- %.2f' % (
+                         position + 1, label(brains[player]), mean,
+                         interval))
+        lines.append('')
+
+    lines.append('Pairings (fox \\ hare), %d%% confidence:' % (
+                 confidence * 100))
+    lines.append(' ' * 20 + ''.join('%20s' % label(brain)[:19]
+                                    for brain in hare_brains))
+    for fox, brain in enumerate(fox_brains):
+        pairings = [summary(results[fox, hare])
+                    for hare in xrange(len(hare_brains))]
+        lines.append('%-20s' % label(brain)[:19] + ''.join(
+                     '%20s' % ('%.2f +- %.2f' % (stats.mean,
+                                                 stats.interval(confidence)))
+                     for stats in pairings))
+
+    return '\n'.join(lines)
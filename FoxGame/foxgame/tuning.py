@@ -0,0 +1,310 @@
+"""
+tuning.py: hyperparameter search for the nn hare brain (TUNE).
+
+Each trial trains a network with a configuration of nn.HareBrain
+extraoptions (e.g. {'hiddens': '30', 'epsilon': '0.2'}) for a number
+of epochs, then plays games against a fox brain: its score is the mean
+of the carrots per minute. Trials run in a pool of processes, each one
+in its own directory, so they never share network files.
+
+Configurations are chosen by a strategy:
+ - 'grid':    every combination of the values given;
+ - 'random':  a random sample of the combinations; values given as a
+              'low..high' range are drawn uniformly;
+ - 'halving': successive halving, which trains all the configurations
+              for a few epochs, then goes on training only the best
+              1/eta of them for eta times more epochs, and so on.
+"""
+from __future__ import division
+from multiprocessing import Pool, cpu_count
+from os.path import exists
+from os.path import join as osjoin
+from os import makedirs, remove
+from random import Random
+from timeit import default_timer as timer
+import json
+import sys
+
+from foxgame.factories import (GameFactory, ControllerFactory,
+                               load_brain, load_extraopts)
+from foxgame.controllers.libs.neuralnet.nn import load_network
+from foxgame.stats import RunningStats
+from foxgame.UI.simulator import play, score
+
+import logging
+log = logging.getLogger('TUNE')
+
+STRATEGIES = ('grid', 'random', 'halving')
+
+
+def label(config):
+    """
+    Return the extraoptions of a configuration, as given on command line.
+    """
+    return ' '.join('%s:%s' % item for item in sorted(config.iteritems()))
+
+
+def _range(value):
+    """
+    Return (low, high) if value is a 'low..high' range, None otherwise.
+    """
+    if '..' not in value:
+        return None
+    low, high = value.split('..', 1)
+    return low, high
+
+
+def grid(space):
+    """
+    Return every configuration of a space, a dictionary
+    option name -> list of values.
+    """
+    configs = [{}]
+    for name, values in sorted(space.iteritems()):
+        if any(_range(value) for value in values):
+            raise ValueError('ranges can only be sampled: %s' % name)
+        configs = [dict(config, **{name: value})
+                   for config in configs for value in values]
+    return configs
+
+
+def sample(space, trials, random):
+    """
+    Return trials random configurations of a space (see grid).
+    Values given as 'low..high' are drawn uniformly in the range,
+    as integers if both ends are.
+    """
+    def draw(values):
+        value = random.choice(values)
+        bounds = _range(value)
+        if bounds is None:
+            return value
+        try:
+            return str(random.randint(int(bounds[0]), int(bounds[1])))
+        except ValueError:
+            return '%.4g' % random.uniform(float(bounds[0]),
+                                           float(bounds[1]))
+
+    # with no ranges, configurations are drawn without repetitions
+    if not any(_range(value) for values in space.itervalues()
+               for value in values):
+        configs = grid(space)
+        return random.sample(configs, min(trials, len(configs)))
+
+    return [dict((name, draw(values))
+                 for name, values in sorted(space.iteritems()))
+            for x in xrange(trials)]
+
+
+def _configure(brain, config, names=()):
+    """
+    Set the extraoptions of config in the brain class. Return the
+    previous values of them, and of the other attributes in names.
+    """
+    saved = dict((name, getattr(brain, name))
+                 for name in config.keys() + list(names))
+    load_extraopts(sys.modules[brain.__module__], brain, config)
+    return saved
+
+
+def _restore(brain, saved):
+    """
+    Set back attributes changed by _configure.
+    """
+    for name, value in saved.iteritems():
+        setattr(brain, name, value)
+
+
+def evaluate(job):
+    """
+    Train (or go on training) the network of a trial up to 'epochs'
+    epochs, then play games with it. Return the record of the trial.
+    """
+    trial, config, epochs, dir, seeds, fox_brain, timestep, looptime = job
+
+    start = timer()
+    brain = load_brain('nn', 'HareBrain')
+    saved = _configure(brain, config, ('epochs', '_net_data'))
+    try:
+        brain._net_data = osjoin(dir, 'synapsis_hare.db')
+
+        # epochs already trained in a previous round
+        state = osjoin(dir, 'trial.json')
+        done, error = 0, None
+        network = None
+        if exists(state):
+            with open(state) as saved_state:
+                done, error = json.load(saved_state)
+            network = load_network(brain._net_data)
+
+        if epochs > done:
+            brain.epochs = epochs - done
+            error, trained = brain.train_network((brain.inputs,
+                                                  brain.hiddens),
+                                                 brain.examples, network)
+            with open(state, 'w') as saved_state:
+                json.dump((epochs, error), saved_state)
+
+        gfact = GameFactory((600, 400), ControllerFactory(brain),
+                            ControllerFactory(load_brain(fox_brain,
+                                                         'FoxBrain')))
+        stats = RunningStats()
+        for seed in seeds:
+            game = gfact.new_game(seed)
+            try:
+                play(game, timestep, looptime)
+                stats.add(score(game))
+            finally:
+                game.end()
+    finally:
+        _restore(brain, saved)
+
+    return {'trial': trial,
+            'config': config,
+            'epochs': epochs,
+            'error': error,
+            'cpm': stats.mean,
+            'interval': stats.interval(),
+            'games': stats.count,
+            'time': timer() - start}
+
+
+def _run_round(pool, jobs):
+    """
+    Evaluate jobs in the pool (serially if pool is None).
+    """
+    records = []
+    for record in (pool.imap_unordered(evaluate, jobs) if pool is not None
+                   else (evaluate(job) for job in jobs)):
+        log.info('trial %d (%s), %d epochs: %.2f cpm' % (
+                 record['trial'], label(record['config']), record['epochs'],
+                 record['cpm']))
+        records.append(record)
+    return records
+
+
+def run(space, strategy='grid', trials=None, epochs=100, min_epochs=None,
+        eta=3, games=100, seed=None, workers=None, outdir='benchmarking-nn',
+        fox_brain='traditional', timestep=1/32, looptime=300):
+    """
+    Search the best configuration of the space (see grid) with the given
+    strategy, using 'workers' processes (by default, one for each cpu).
+    'trials' configurations are sampled by the random strategy (and by
+    halving, if given). Networks are trained up to 'epochs' epochs,
+    starting from min_epochs (by default epochs/eta**2) when halving.
+    Each trial saves its network into a directory of outdir.
+
+    Return the records of all the rounds of each trial (see evaluate).
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError('unknown strategy %s' % strategy)
+
+    random = Random(seed)
+    if strategy == 'grid' or (strategy == 'halving' and not trials):
+        configs = grid(space)
+    else:
+        configs = sample(space, trials or 10, random)
+    seeds = [random.randrange(2**32) for x in xrange(games)]
+
+    if strategy == 'halving':
+        budget = min_epochs or max(1, int(epochs / eta**2))
+    else:
+        budget = epochs
+
+    dirs = []
+    for trial in xrange(len(configs)):
+        dirs.append(osjoin(outdir, 'trial-%03d' % trial))
+        if not exists(dirs[-1]):
+            makedirs(dirs[-1])
+        elif exists(osjoin(dirs[-1], 'trial.json')):
+            # left by a previous search: don't go on training its network
+            remove(osjoin(dirs[-1], 'trial.json'))
+
+    # parse the examples once, before workers need them
+    brain = load_brain('nn', 'HareBrain')
+    common = dict(item for item in configs[0].iteritems()
+                  if all(config.get(item[0]) == item[1]
+                         for config in configs))
+    saved = _configure(brain, common)
+    try:
+        brain.dataset(brain.examples)
+    finally:
+        _restore(brain, saved)
+
+    workers = workers or cpu_count()
+    pool = Pool(workers) if workers > 1 else None
+
+    records = []
+    alive = range(len(configs))
+    try:
+        while True:
+            log.info('training %d configurations for %d epochs' % (
+                     len(alive), budget))
+            results = _run_round(pool, [(trial, configs[trial], budget,
+                                         dirs[trial], seeds, fox_brain,
+                                         timestep, looptime)
+                                        for trial in alive])
+            records.extend(results)
+
+            if strategy != 'halving' or budget >= epochs:
+                break
+
+            # prune all but the best configurations
+            results.sort(key=lambda record: -record['cpm'])
+            alive = sorted(record['trial'] for record in
+                           results[:max(1, len(results) // eta)])
+            # the last configuration left is trained for all the epochs
+            budget = epochs if len(alive) == 1 else min(epochs, budget * eta)
+
+        if pool is not None:
+            pool.close()
+    except:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.join()
+
+    return records
+
+
+def ranking(records):
+    """
+    Return the last record of each trial, best first: trials trained
+    for more epochs (survived more rounds) come before the others.
+    """
+    last = {}
+    for record in records:
+        if (record['trial'] not in last or
+            record['epochs'] > last[record['trial']]['epochs']):
+            last[record['trial']] = record
+
+    return sorted(last.itervalues(),
+                  key=lambda record: (-record['epochs'], -record['cpm']))
+
+
+def format_results(records):
+    """
+    Return the table of trials, ranked. Configurations only show the
+    options which differ between trials.
+    """
+    first = records[0]['config'] if records else {}
+    varying = set(name for record in records
+                  for name, value in record['config'].iteritems()
+                  if first.get(name) != value)
+
+    lines = ['%4s %-36s %7s %10s %16s %8s' % ('rank', 'configuration',
+                                              'epochs', 'error',
+                                              'cpm', 'time(s)')]
+    for position, record in enumerate(ranking(records)):
+        error = record['error']
+        lines.append('%4d %-36s %7d %10s %16s %8.1f' % (
+                     position + 1,
+                     label(dict(item for item in record['config'].iteritems()
+                                if item[0] in varying))[:36],
+                     record['epochs'],
+                     '-' if error is None else '%.3g' % error,
+                     '%.2f +- %.2f' % (record['cpm'], record['interval']),
+                     record['time']))
+    return '\n'.join(lines)